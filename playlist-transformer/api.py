@@ -1,5 +1,5 @@
 from fastapi import FastAPI, Request, Form, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse, RedirectResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 import uvicorn
@@ -7,15 +7,27 @@ import json
 import os
 import asyncio
 import signal
-from typing import Dict, List, Optional
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass, asdict
 
 # Import our modules
-from auth_browser import AuthManager
-from fetch_spotify import SpotifyFetcher
-from fetch_ytm import YTMFetcher
-from match_engine import MatchEngine
+from auth_browser import AuthManager, get_auth_driver_pool
+from fetch_spotify import get_spotify_driver_pool
+from spotify_client import get_spotify_client
+from match_cache import get_match_cache
+from confirmed_matches import get_confirmed_matches
+from rate_limit import rate_limiter_stats
 from converter import Converter
+import registry
+from jobs import JobManager, MatchJob, SQLiteJobStore
+from session_store import SessionStore, SQLiteSessionStore
+from tracks import MatchEntry, compact_library, json_default
+from metrics import REGISTRY, STAGE_SECONDS, CallbackMetric, Counter, process_memory_bytes
 
 # Define missing types for type hinting
 class AuthProvider:
@@ -36,9 +48,6 @@ app = FastAPI(title="Spotify ↔ YouTube Music Converter")
 templates = Jinja2Templates(directory="templates")
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# Global state (in production, use proper session management)
-session_data = {}
-
 # Initialize cookie files if they don't exist
 try:
     if not os.path.exists("spotify_cookies.json"):
@@ -60,6 +69,143 @@ class ConversionSession:
     auth_manager: Optional[AuthManager] = None  # Store auth manager instance
     source_authenticated: bool = False  # Track source platform auth status
     target_authenticated: bool = False  # Track target platform auth status
+    match_job_id: Optional[str] = None  # Background matching job, if any
+    library_status: Optional[Dict[str, str]] = None  # Section -> "loading", "done" or "failed"
+    
+    def __post_init__(self):
+        # Sessions decoded from JSON (SESSION_BACKEND=sqlite) get compact tracks back
+        self.source_library = compact_library(self.source_library)
+        if self.matched_tracks:
+            self.matched_tracks = [MatchEntry.from_dict(match) for match in self.matched_tracks]
+
+# SESSION_BACKEND=sqlite shares sessions and jobs between worker processes through SESSION_DB_PATH
+SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "memory")
+SESSION_DB_PATH = os.environ.get("SESSION_DB_PATH", "sessions.db")
+SESSION_IDLE_TTL = float(os.environ.get("SESSION_IDLE_TTL", 3600))
+
+# Background matching jobs, see /match
+job_manager = JobManager(store=SQLiteJobStore(SESSION_DB_PATH) if SESSION_BACKEND == "sqlite" else None)
+
+def release_session(session):
+    """Free what an evicted session still holds: its login browser and match job"""
+    if session.auth_manager:
+        session.auth_manager.force_close_driver()
+        session.auth_manager = None
+    if session.match_job_id:
+        job_manager.remove(session.match_job_id)
+
+if SESSION_BACKEND == "sqlite":
+    session_data = SQLiteSessionStore(
+        ConversionSession,
+        path=SESSION_DB_PATH,
+        idle_ttl=SESSION_IDLE_TTL,
+        on_evict=release_session
+    )
+else:
+    # Idle sessions expire, big libraries spill to disk over the memory budget
+    session_data = SessionStore(
+        idle_ttl=SESSION_IDLE_TTL,
+        memory_budget=int(os.environ.get("SESSION_MEMORY_BUDGET_MB", 512)) * 1024 * 1024,
+        spill_dir=os.environ.get("SESSION_SPILL_DIR", "session_spill"),
+        on_evict=release_session
+    )
+
+# Prometheus metrics served on /metrics; stage latencies are recorded where each stage runs
+MATCHED_TRACKS = REGISTRY.register(Counter(
+    "playlist_matched_tracks_total", "Tracks matched by background jobs, by result status", ("status",)
+))
+
+def _pool_metric(key: str) -> Dict:
+    return {
+        ("spotify",): get_spotify_driver_pool().stats()[key],
+        ("auth",): get_auth_driver_pool().stats()[key]
+    }
+
+def _rate_limit_metric(key: str) -> Dict:
+    return {(name,): stats[key] for name, stats in rate_limiter_stats().items()}
+
+for _metric in (
+    CallbackMetric("playlist_sessions", "Active conversion sessions", lambda: len(session_data)),
+    CallbackMetric("playlist_match_jobs", "Match jobs held by this worker", lambda: len(job_manager)),
+    CallbackMetric("playlist_process_resident_bytes", "Resident memory of this worker", process_memory_bytes),
+    CallbackMetric("playlist_session_resident_bytes", "Estimated memory held by in-memory session libraries",
+                   lambda: session_data.stats().get("resident_bytes_estimate", 0)),
+    CallbackMetric("playlist_driver_pool_live", "Live Chrome drivers per pool",
+                   lambda: _pool_metric("live"), ("pool",)),
+    CallbackMetric("playlist_driver_pool_in_use", "Checked out Chrome drivers per pool",
+                   lambda: _pool_metric("in_use"), ("pool",)),
+    CallbackMetric("playlist_match_cache_hits_total", "Match cache hits",
+                   lambda: get_match_cache().hits, kind="counter"),
+    CallbackMetric("playlist_match_cache_misses_total", "Match cache misses",
+                   lambda: get_match_cache().misses, kind="counter"),
+    CallbackMetric("playlist_rate_limit_throttles_total", "Throttled responses per rate limiter",
+                   lambda: _rate_limit_metric("throttles"), ("limiter",), kind="counter"),
+    CallbackMetric("playlist_rate_limit_rate", "Current allowed requests per second per rate limiter",
+                   lambda: _rate_limit_metric("rate"), ("limiter",))
+):
+    REGISTRY.register(_metric)
+
+LIBRARY_SECTIONS = ("liked_songs", "playlists", "albums", "artists")
+MAX_PAGE_SIZE = 500
+
+# Library sections load here in the background, each is served as soon as it arrives
+library_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("LIBRARY_FETCH_WORKERS", 8)), thread_name_prefix="library"
+)
+# Serializes read-modify-write updates of a session from background threads
+_session_update_lock = threading.Lock()
+
+def start_library_load(session_id: str, session: ConversionSession):
+    """Fetch the source library section by section, saving the session as each one finishes"""
+    session.source_library = {name: {} for name in LIBRARY_SECTIONS}
+    session.library_status = {name: "loading" for name in LIBRARY_SECTIONS}
+    session_data.save(session_id, session)
+    
+    def load():
+        try:
+            fetcher = registry.get_fetcher(session.source_platform)
+            sections = fetcher.library_sections()
+        except Exception as e:
+            print(f"Error preparing library fetch for session {session_id}: {e}")
+            sections = {}
+        for name in LIBRARY_SECTIONS:
+            library_executor.submit(load_section, name, sections.get(name))
+    
+    def load_section(name: str, fetch):
+        items, status = {}, "failed"
+        if fetch:
+            try:
+                items, status = fetch(), "done"
+            except Exception as e:
+                print(f"Error fetching {name} for session {session_id}: {e}")
+        with _session_update_lock:
+            # Re-read: the session may have been spilled, changed by another worker or evicted
+            current = session_data.get(session_id)
+            if current is None:
+                return
+            current.source_library[name] = items
+            current.library_status = dict(current.library_status or {}, **{name: status})
+            session_data.save(session_id, current)
+    
+    library_executor.submit(load)
+
+def _library_item(item: Dict) -> Dict:
+    """JSON view of a library item, playlists are listed without their tracks"""
+    data = {key: value for key, value in item.items() if key != "tracks"}
+    if "tracks" in item:
+        data["track_count"] = len(item["tracks"] or [])
+    return data
+
+def library_page(items, cursor: int, limit: int) -> Dict:
+    """One page of a library section (dict) or track list, with the cursor of the next page"""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    cursor = max(cursor, 0)
+    values = items.values() if isinstance(items, dict) else items
+    page = [_library_item(item) for item in islice(values, cursor, cursor + limit)]
+    return {
+        "items": page,
+        "next_cursor": cursor + len(page) if cursor + len(page) < len(items) else None
+    }
 
 # Extract platform-specific logic
 class SpotifyAuthProvider(AuthProvider):
@@ -87,25 +233,33 @@ async def landing_page(request: Request):
     """Landing page to choose conversion direction"""
     return templates.TemplateResponse("index.html", {"request": request})
 
+async def run_blocking(fn, *args):
+    """Run a blocking call (browsers, network, matching) on the default executor, off the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(None, partial(fn, *args))
+
+NO_LOGIN_BROWSER = "No login browser is free right now, try again shortly"
+
 @app.post("/auth/start")
 async def start_auth(source: str = Form(...), target: str = Form(...)):
     """Initialize authentication for both platforms"""
-    session_id = f"session_{len(session_data)}"
-    
     # Create auth manager and store it in session
     auth_manager = AuthManager()
-    session_data[session_id] = ConversionSession(
+    session_id = session_data.create(ConversionSession(
         source, target, 
         auth_manager=auth_manager,
         source_authenticated=False,
         target_authenticated=False
-    )
+    ))
     
-    # Start auth for source platform first
-    if source == "spotify":
-        auth_url = auth_manager.start_spotify_auth()
-    else:  # ytm
-        auth_url = auth_manager.start_ytm_auth()
+    # Start auth for source platform first; checking out a login browser may wait for one
+    try:
+        with STAGE_SECONDS.labels("auth_start").time():
+            if source == "spotify":
+                auth_url = await run_blocking(auth_manager.start_spotify_auth)
+            else:  # ytm
+                auth_url = await run_blocking(auth_manager.start_ytm_auth)
+    except TimeoutError:
+        raise HTTPException(status_code=503, detail=NO_LOGIN_BROWSER)
     
     # Redirect to the authentication page instead of returning JSON
     return RedirectResponse(url=f"/auth/{source}?session_id={session_id}")
@@ -164,7 +318,7 @@ async def complete_auth(session_id: str = Form(...), platform: str = Form(...)):
             
             if platform == session.source_platform:
                 # This is source platform authentication
-                print(f"DEBUG: Spotify source authentication - skipping library fetch for now")
+                print(f"DEBUG: Spotify source authentication - library loads in the background")
                 session.source_library = {"playlists": {}, "liked_songs": {}, "albums": {}, "artists": {}}
                 session.source_authenticated = True
                 print(f"DEBUG: Spotify source authentication marked as complete")
@@ -177,7 +331,7 @@ async def complete_auth(session_id: str = Form(...), platform: str = Form(...)):
             
             if platform == session.source_platform:
                 # This is source platform authentication
-                print(f"DEBUG: YTM source authentication - skipping library fetch for now")
+                print(f"DEBUG: YTM source authentication - library loads in the background")
                 session.source_library = {"playlists": {}, "liked_songs": {}, "albums": {}, "artists": {}}
                 session.source_authenticated = True
                 print(f"DEBUG: YTM source authentication marked as complete")
@@ -189,10 +343,20 @@ async def complete_auth(session_id: str = Form(...), platform: str = Form(...)):
         print(f"DEBUG: Authentication successful, closing browser...")
         # Close the browser after successful authentication
         if session.auth_manager:
-            session.auth_manager.complete_and_close()
+            with STAGE_SECONDS.labels("auth_complete").time():
+                await run_blocking(session.auth_manager.complete_and_close)
             session.auth_manager = None
             print(f"DEBUG: Browser closed, auth_manager set to None")
         
+        if platform == "spotify":
+            # Pooled Spotify drivers and the HTTP client's token belong to the previous cookies
+            get_spotify_driver_pool().invalidate()
+            get_spotify_client().invalidate()
+        
+        if platform == session.source_platform and session.library_status is None:
+            # Start on the library while the user logs in to the target platform
+            start_library_load(session_id, session)
+        
         # Check if we need to authenticate the target platform
         if session.source_authenticated and not session.target_authenticated:
             print(f"DEBUG: Starting target platform authentication for session {session_id}")
@@ -201,21 +365,27 @@ async def complete_auth(session_id: str = Form(...), platform: str = Form(...)):
             session.auth_manager = auth_manager
             
             # Start authentication for target platform
-            if session.target_platform == "spotify":
-                print(f"DEBUG: Starting Spotify target authentication")
-                auth_url = auth_manager.start_spotify_auth()
-            else:  # ytm
-                print(f"DEBUG: Starting YTM target authentication")
-                auth_url = auth_manager.start_ytm_auth()
+            with STAGE_SECONDS.labels("auth_start").time():
+                if session.target_platform == "spotify":
+                    print(f"DEBUG: Starting Spotify target authentication")
+                    auth_url = await run_blocking(auth_manager.start_spotify_auth)
+                else:  # ytm
+                    print(f"DEBUG: Starting YTM target authentication")
+                    auth_url = await run_blocking(auth_manager.start_ytm_auth)
             
+            session_data.save(session_id, session)
             print(f"DEBUG: Redirecting to {session.target_platform} authentication")
             # Redirect to target platform authentication
             return RedirectResponse(url=f"/auth/{session.target_platform}?session_id={session_id}")
         
+        session_data.save(session_id, session)
+        
         # Both platforms authenticated, go to library
         print(f"DEBUG: All authentication completed for session {session_id}, redirecting to library")
         return RedirectResponse(url=f"/library?session_id={session_id}")
         
+    except TimeoutError:
+        raise HTTPException(status_code=503, detail=NO_LOGIN_BROWSER)
     except Exception as e:
         print(f"DEBUG: Exception in auth completion: {e}")
         import traceback
@@ -236,6 +406,8 @@ async def cancel_auth(session_id: str = Form(...)):
         session.auth_manager = None
     
     # Remove session
+    if session.match_job_id:
+        job_manager.remove(session.match_job_id)
     del session_data[session_id]
     
     return RedirectResponse(url="/")
@@ -323,52 +495,201 @@ async def show_library(request: Request, session_id: str):
         raise HTTPException(status_code=400, detail="Invalid session")
     
     session = session_data[session_id]
-    if not session.source_library:
+    if not session.source_authenticated:
         raise HTTPException(status_code=400, detail="No library data")
+    if session.library_status is None:
+        start_library_load(session_id, session)
     
+    # Sections are fetched by the page from /library/section/{section} once they are loaded
     return templates.TemplateResponse(
         "library.html",
         {
             "request": request,
             "session_id": session_id,
-            "library": session.source_library,
+            "sections": session.library_status,
             "platform": session.source_platform,
             "target_platform": session.target_platform
         }
     )
 
+@app.get("/library/status")
+async def library_status(session_id: str):
+    """Load status and item count of every library section"""
+    if session_id not in session_data:
+        raise HTTPException(status_code=400, detail="Invalid session")
+    
+    session = session_data[session_id]
+    library = session.source_library or {}
+    return {
+        name: {"status": status, "count": len(library.get(name) or {})}
+        for name, status in (session.library_status or {}).items()
+    }
+
+@app.get("/library/section/{section}")
+async def library_section(session_id: str, section: str, cursor: int = 0, limit: int = 100):
+    """One page of a loaded library section, pass ``next_cursor`` back as ``cursor`` for the next"""
+    if session_id not in session_data:
+        raise HTTPException(status_code=400, detail="Invalid session")
+    if section not in LIBRARY_SECTIONS:
+        raise HTTPException(status_code=404, detail="Unknown section")
+    
+    session = session_data[session_id]
+    status = (session.library_status or {}).get(section, "loading")
+    return dict(library_page((session.source_library or {}).get(section) or {}, cursor, limit), status=status)
+
+@app.get("/library/playlist/{playlist_id}/tracks")
+async def library_playlist_tracks(session_id: str, playlist_id: str, cursor: int = 0, limit: int = 100):
+    """One page of a playlist's tracks, loaded when the playlist is expanded"""
+    if session_id not in session_data:
+        raise HTTPException(status_code=400, detail="Invalid session")
+    
+    session = session_data[session_id]
+    playlist = ((session.source_library or {}).get("playlists") or {}).get(playlist_id)
+    if playlist is None:
+        raise HTTPException(status_code=404, detail="Unknown playlist")
+    return library_page(playlist.get("tracks") or [], cursor, limit)
+
+def tracks_of_items(library: Optional[Dict], selected_items: List[str]) -> List[Dict]:
+    """Tracks of the selected library items: single tracks, liked songs or whole playlists"""
+    library = library or {}
+    tracks = []
+    for item_id in selected_items:
+        if item_id in library.get("tracks", {}):
+            tracks.append(library["tracks"][item_id])
+        elif item_id in library.get("liked_songs", {}):
+            tracks.append(library["liked_songs"][item_id])
+        elif item_id in library.get("playlists", {}):
+            tracks.extend(library["playlists"][item_id].get("tracks") or [])
+    return tracks
+
 @app.post("/match")
 async def start_matching(session_id: str = Form(...), selected_items: List[str] = Form(...)):
-    """Start matching selected items on target platform"""
+    """Start matching selected items on target platform in the background"""
     if session_id not in session_data:
         raise HTTPException(status_code=400, detail="Invalid session")
     
     session = session_data[session_id]
     session.selected_tracks = selected_items
-    
-    # Get selected tracks from library
-    tracks_to_match = []
-    for item_id in selected_items:
-        if item_id in session.source_library.get("tracks", {}):
-            tracks_to_match.append(session.source_library["tracks"][item_id])
-    
-    # Perform matching
-    match_engine = MatchEngine()
-    session.matched_tracks = match_engine.match_tracks(
-        tracks_to_match, 
-        session.source_platform, 
-        session.target_platform
-    )
+    session.matched_tracks = None
+    
+    tracks_to_match = tracks_of_items(session.source_library, selected_items)
+    
+    def run(job: MatchJob) -> List[Dict]:
+        match_engine = registry.get_match_engine()
+        return match_engine.match_tracks(
+            tracks_to_match, 
+            session.source_platform, 
+            session.target_platform,
+            on_result=job.record,
+            on_dedup=job.set_stats
+        )
+    
+    job_id = uuid.uuid4().hex
+    
+    def on_complete(results: List[Dict]):
+        for match in results:
+            MATCHED_TRACKS.labels(match["status"]).inc()
+        with _session_update_lock:
+            # Re-read: the session captured above may be stale by now, saving it would undo later changes
+            current = session_data.get(session_id)
+            if current is None or current.match_job_id != job_id:
+                return  # Session gone, or a newer /match replaced this job
+            current.matched_tracks = results
+            session_data.save(session_id, current)
+    
+    # Recorded before the job starts, so on_complete always finds it
+    previous_job_id = session.match_job_id
+    session.match_job_id = job_id
+    session_data.save(session_id, session)
+    if previous_job_id:
+        job_manager.remove(previous_job_id)
+    
+    # Matching runs in a worker; the results page streams progress from it
+    job_manager.start(session_id, len(tracks_to_match), run, on_complete, job_id=job_id)
     
     return RedirectResponse(url=f"/match/results?session_id={session_id}")
 
+@app.get("/match/progress/{job_id}")
+async def match_progress(job_id: str):
+    """Progress of a background matching job"""
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    
+    return job.progress()
+
+@app.get("/match/stream/{job_id}")
+async def stream_matches(job_id: str, cursor: int = 0):
+    """Stream matching progress and results as Server-Sent Events"""
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    
+    async def events():
+        position = cursor
+        last_completed = -1
+        while True:
+            # Read the status first: once finished, every result is already recorded
+            finished = job.status != "running"
+            updates = job.updates_since(position)
+            for update in updates:
+                position += 1
+                yield f"id: {position}\nevent: match\ndata: {json.dumps(update, default=json_default)}\n\n"
+            
+            progress = job.progress()
+            if progress["completed"] != last_completed or finished:
+                last_completed = progress["completed"]
+                yield f"event: progress\ndata: {json.dumps(progress)}\n\n"
+            
+            if finished:
+                yield f"event: done\ndata: {json.dumps(progress)}\n\n"
+                break
+            
+            await asyncio.sleep(0.5)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+MATCH_STATUSES = ("matched", "low_confidence", "not_found")
+
+def status_counts(matches: List[Dict]) -> Dict[str, int]:
+    counts = dict.fromkeys(MATCH_STATUSES, 0)
+    for match in matches:
+        counts[match["status"]] = counts.get(match["status"], 0) + 1
+    return counts
+
 @app.get("/match/results")
 async def show_matches(request: Request, session_id: str):
-    """Show matching results with correction options"""
+    """Show matching results with correction options
+    
+    The page only carries the counts; its list loads pages from
+    /match/entries as it is scrolled.
+    """
     if session_id not in session_data:
         raise HTTPException(status_code=400, detail="Invalid session")
     
     session = session_data[session_id]
+    job = job_manager.get(session.match_job_id) if session.match_job_id else None
+    
+    # While the job runs the page starts empty and fills in from the stream
+    if job and job.status == "running":
+        return templates.TemplateResponse(
+            "matches.html",
+            {
+                "request": request,
+                "session_id": session_id,
+                "counts": dict.fromkeys(MATCH_STATUSES, 0),
+                "job": job.progress(),
+                "target_platform": session.target_platform
+            }
+        )
+    
+    if job and job.status == "failed":
+        raise HTTPException(status_code=500, detail=f"Matching failed: {job.error}")
+    
     if not session.matched_tracks:
         raise HTTPException(status_code=400, detail="No matches found")
     
@@ -377,70 +698,223 @@ async def show_matches(request: Request, session_id: str):
         {
             "request": request,
             "session_id": session_id,
-            "matches": session.matched_tracks,
+            "counts": status_counts(session.matched_tracks),
+            "job": None,
             "target_platform": session.target_platform
         }
     )
 
+@app.get("/match/entries")
+async def match_entries(session_id: str, cursor: int = 0, limit: int = 100, status: str = ""):
+    """One page of match results as JSON, optionally only those with ``status``
+    
+    Pass ``next_cursor`` back as ``cursor`` for the following page, it is
+    null after the last one. Results keep the order of the matched tracks.
+    """
+    if session_id not in session_data:
+        raise HTTPException(status_code=400, detail="Invalid session")
+    if status and status not in MATCH_STATUSES:
+        raise HTTPException(status_code=400, detail="Unknown status")
+    
+    session = session_data[session_id]
+    if not session.matched_tracks:
+        raise HTTPException(status_code=400, detail="No matches found")
+    
+    matches = session.matched_tracks
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    page = []
+    index = max(cursor, 0)
+    while index < len(matches) and len(page) < limit:
+        if not status or matches[index]["status"] == status:
+            page.append(dict(matches[index]))
+        index += 1
+    
+    return {
+        "matches": page,
+        "next_cursor": index if index < len(matches) else None,
+        "counts": status_counts(matches)
+    }
+
 @app.post("/match/correct")
 async def correct_match(
     session_id: str = Form(...),
     track_id: str = Form(...),
-    corrected_title: str = Form(...),
-    corrected_artist: str = Form(...)
+    corrected_title: str = Form(""),
+    corrected_artist: str = Form(""),
+    alternative_id: str = Form("")
 ):
-    """Correct a mismatched track"""
+    """Correct a mismatched track, either by picking a stored alternative or by searching again"""
     if session_id not in session_data:
         raise HTTPException(status_code=400, detail="Invalid session")
     
     session = session_data[session_id]
-    match_engine = MatchEngine()
-    
-    # Re-match with corrected info
-    corrected_match = match_engine.rematch_track(
-        corrected_title, 
-        corrected_artist, 
-        session.target_platform
-    )
-    
-    # Update the match in session
-    for match in session.matched_tracks:
-        if match["original_id"] == track_id:
-            match.update(corrected_match)
-            break
+    match = next((m for m in session.matched_tracks or [] if m["original_id"] == track_id), None)
+    if match is None:
+        raise HTTPException(status_code=400, detail="Unknown track")
+    
+    match_engine = registry.get_match_engine()
+    
+    if alternative_id:
+        # Runners-up from the original search, no new search needed
+        corrected_match = match_engine.select_alternative(match, alternative_id)
+        if corrected_match is None:
+            raise HTTPException(status_code=400, detail="Unknown alternative")
+    else:
+        # Re-match with corrected info; the search blocks, keep it off the event loop
+        corrected_match = await run_blocking(
+            match_engine.rematch_track,
+            corrected_title, 
+            corrected_artist, 
+            session.target_platform
+        )
+    
+    # Update the match in session, re-read since the search may have taken a while
+    with _session_update_lock:
+        session = session_data.get(session_id)
+        matches = (session.matched_tracks or []) if session else []
+        match = next((m for m in matches if m["original_id"] == track_id), None)
+        if match is None:
+            raise HTTPException(status_code=409, detail="Session changed during the correction")
+        match.update(corrected_match)
+        session_data.save(session_id, session)
     
     return {"success": True, "match": corrected_match}
 
+def _source_tracks(session: ConversionSession, track_ids: set) -> Dict[str, Dict]:
+    """Source tracks of the session's selected items by id, for the ids given
+    
+    Track ids are only unique within a playlist (Spotify numbers each
+    playlist's tracks from track_0), so ids shared by different tracks of the
+    selection are left out rather than guessed.
+    """
+    found = {}
+    ambiguous = set()
+    for track in tracks_of_items(session.source_library, session.selected_tracks or []):
+        track_id = track.get("id")
+        if track_id not in track_ids:
+            continue
+        if track_id in found and found[track_id] != track:
+            ambiguous.add(track_id)
+        found[track_id] = track
+    for track_id in ambiguous:
+        del found[track_id]
+    return found
+
+def record_confirmed_matches(session: ConversionSession, final_matches: List[Dict]):
+    """Add the matched tracks of a created playlist to the confirmed match index"""
+    matched = [match for match in final_matches if match["status"] == "matched"]
+    sources = _source_tracks(session, {match["original_id"] for match in matched})
+    get_confirmed_matches().record_many([
+        (sources[match["original_id"]],
+         {"title": match["matched_title"], "artist": match["matched_artist"], "id": match["matched_id"]})
+        for match in matched if match["original_id"] in sources
+    ], session.target_platform)
+
+def _sync_source(session: ConversionSession, playlist_id: str) -> Optional[Tuple[str, str, List[Dict]]]:
+    """(sync key, name, tracks) of a source playlist or "liked_songs", None if the library has no such playlist"""
+    library = session.source_library or {}
+    
+    if playlist_id == "liked_songs":
+        name = "Liked Songs"
+        source_ref = "liked_songs"
+        tracks = list(library.get("liked_songs", {}).values())
+    elif playlist_id in library.get("playlists", {}):
+        playlist = library["playlists"][playlist_id]
+        name = playlist.get("name") or "Converted Playlist"
+        # Library ids (playlist_0, ...) change between fetches, the platform's own id does not
+        source_ref = playlist.get("uri") or playlist.get("ytm_id") or name
+        tracks = playlist.get("tracks", [])
+    else:
+        return None
+    
+    return f"{session.source_platform}:{source_ref}->{session.target_platform}", name, tracks
+
+def record_sync_target(session: ConversionSession, final_matches: List[Dict], playlist_url: str):
+    """Make a playlist created from one whole source playlist (or all liked songs) the target of its /sync"""
+    selected = session.selected_tracks or []
+    liked = (session.source_library or {}).get("liked_songs") or {}
+    if len(selected) == 1 and selected[0] != "liked_songs":
+        source = _sync_source(session, selected[0])
+    elif liked and set(selected) == set(liked):
+        source = _sync_source(session, "liked_songs")
+    else:
+        return  # Single tracks or several playlists: nothing to sync against
+    
+    # Imported here: resync pulls in the match engine, see registry
+    from resync import playlist_id_from_url
+    
+    target_id = playlist_id_from_url(session.target_platform, playlist_url)
+    if not source or not target_id:
+        return
+    sync_key, _, tracks = source
+    try:
+        registry.get_playlist_sync().adopt(
+            sync_key, tracks, session.target_platform, target_id,
+            {match["original_id"]: match["matched_id"] for match in final_matches if match["matched_id"]}
+        )
+    except Exception as e:
+        print(f"Error recording sync target of {sync_key}: {e}")
+
 @app.post("/confirm")
 async def confirm_conversion(
     session_id: str = Form(...),
-    final_tracks: List[str] = Form(...)
+    final_tracks: List[str] = Form([]),
+    include_found: bool = Form(False),
+    excluded_tracks: List[str] = Form([])
 ):
-    """Create playlist on target platform"""
+    """Create playlist on target platform
+    
+    The tracks are either listed in ``final_tracks`` or, with
+    ``include_found``, every found track except ``excluded_tracks``. The
+    results page only holds the rows in view, so it sends the latter.
+    """
     if session_id not in session_data:
         raise HTTPException(status_code=400, detail="Invalid session")
     
     session = session_data[session_id]
     
     # Filter to only selected tracks
-    final_matches = [
-        match for match in session.matched_tracks 
-        if match["original_id"] in final_tracks
-    ]
+    if include_found:
+        excluded = set(excluded_tracks)
+        final_matches = [
+            match for match in session.matched_tracks or []
+            if match["status"] in ("matched", "low_confidence") and match["original_id"] not in excluded
+        ]
+    else:
+        selected = set(final_tracks)
+        final_matches = [
+            match for match in session.matched_tracks or []
+            if match["original_id"] in selected
+        ]
+    
+    if not final_matches:
+        raise HTTPException(status_code=400, detail="No tracks selected")
     
     # Convert and create playlist
     converter = Converter()
     playlist_data = converter.create_playlist_data(final_matches, session.target_platform)
     
-    # Create playlist on target platform
-    if session.target_platform == "spotify":
-        fetcher = SpotifyFetcher()
-        playlist_url = fetcher.create_playlist(playlist_data)
-    else:  # ytm
-        fetcher = YTMFetcher()
-        playlist_url = fetcher.create_playlist(playlist_data)
+    def create() -> str:
+        # Create playlist on target platform
+        with STAGE_SECONDS.labels(f"playlist_create_{session.target_platform}").time():
+            playlist_url = registry.get_fetcher(session.target_platform).create_playlist(playlist_data)
+        if playlist_url:
+            # Tracks kept as matched resolve by exact key next time, without a search
+            record_confirmed_matches(session, final_matches)
+            # So the first /sync of this playlist updates it instead of creating another one
+            record_sync_target(session, final_matches, playlist_url)
+        return playlist_url
+    
+    # Chunked network writes, keep them off the event loop
+    playlist_url = await run_blocking(create)
+    
+    if not playlist_url:
+        # Keep the session: submitting again resumes the write from its last checkpoint
+        raise HTTPException(status_code=502, detail="Playlist could not be completed, submit again to resume")
     
     # Clean up session
+    if session.match_job_id:
+        job_manager.remove(session.match_job_id)
     del session_data[session_id]
     
     return {
@@ -449,14 +923,89 @@ async def confirm_conversion(
         "track_count": len(final_matches)
     }
 
+@app.post("/sync")
+async def sync_playlist(
+    session_id: str = Form(...),
+    playlist_id: str = Form(...)
+):
+    """Re-sync a source playlist (or "liked_songs") into the playlist created by its previous sync
+    
+    Only tracks added since the last sync are matched and appended, and
+    tracks removed from the source are removed from the target.
+    """
+    if session_id not in session_data:
+        raise HTTPException(status_code=400, detail="Invalid session")
+    
+    session = session_data[session_id]
+    source = _sync_source(session, playlist_id)
+    if source is None:
+        raise HTTPException(status_code=400, detail="Unknown playlist")
+    
+    sync_key, name, tracks = source
+    try:
+        # Matching and playlist writes block, keep them off the event loop
+        result = await run_blocking(
+            registry.get_playlist_sync().sync, sync_key, tracks, session.source_platform, session.target_platform, name
+        )
+    except Exception as e:
+        print(f"Error syncing playlist {sync_key}: {e}")
+        raise HTTPException(status_code=500, detail=f"Sync failed: {str(e)}")
+    
+    return dict(result, success=True)
+
+def sweep_idle():
+    """Evict idle sessions and quit pooled browsers idle past their pool's idle_timeout"""
+    session_data.sweep()
+    # Otherwise idle drivers are only reaped by the next checkout, which may never come
+    get_spotify_driver_pool().reap_idle()
+    get_auth_driver_pool().reap_idle()
+
+@app.on_event("startup")
+async def start_session_sweeper():
+    """Evict idle sessions and browsers periodically, not only when new ones are created or checked out"""
+    async def sweep():
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(60)
+            # Eviction may quit browsers, keep it off the event loop
+            try:
+                await loop.run_in_executor(None, sweep_idle)
+            except Exception as e:
+                print(f"Error sweeping idle sessions: {e}")
+    
+    asyncio.create_task(sweep())
+
+@app.on_event("shutdown")
+def close_driver_pools():
+    """Release sessions and quit pooled Chrome instances when the server stops"""
+    library_executor.shutdown(wait=False, cancel_futures=True)
+    session_data.close()
+    get_spotify_driver_pool().close()
+    get_auth_driver_pool().close()
+    registry.close()
+
 @app.get("/status")
 async def get_status():
     """Simple status endpoint"""
     return {
         "status": "running",
         "active_sessions": len(session_data),
+        "sessions": session_data.stats(),
+        "match_jobs": len(job_manager),
+        "driver_pools": {
+            "spotify": get_spotify_driver_pool().stats(),
+            "auth": get_auth_driver_pool().stats()
+        },
+        "match_cache": get_match_cache().stats(),
+        "confirmed_matches": get_confirmed_matches().stats(),
+        "rate_limits": rate_limiter_stats(),
         "version": "1.0.0"
     }
 
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     uvicorn.run(app, host="127.0.0.1", port=8000) 
\ No newline at end of file
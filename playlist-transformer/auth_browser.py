@@ -1,12 +1,49 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
 import time
 import json
 import os
+import threading
 from typing import Dict, Optional
+from driver_pool import DriverPool
+
+def _create_auth_driver():
+    """Start a visible Chrome for interactive login"""
+    # Selenium is only imported once a browser is needed, it is slow to import
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    
+    chrome_options = Options()
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+    
+    driver = webdriver.Chrome(options=chrome_options)
+    driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+    return driver
+
+_auth_pool = None
+_auth_pool_lock = threading.Lock()
+
+def get_auth_driver_pool() -> DriverPool:
+    """Shared pool of login browsers
+    
+    A login browser ends up holding a user's session, so each one is used
+    once (max_uses=1). AUTH_DRIVER_PREWARM keeps that many blank browsers
+    started ahead of time so the login page opens without a cold start.
+    """
+    global _auth_pool
+    if _auth_pool is None:
+        with _auth_pool_lock:
+            if _auth_pool is None:
+                _auth_pool = DriverPool(
+                    _create_auth_driver,
+                    max_size=int(os.environ.get("AUTH_DRIVER_POOL_SIZE", 8)),
+                    max_uses=1,
+                    min_idle=int(os.environ.get("AUTH_DRIVER_PREWARM", 0)),
+                    name="auth driver"
+                )
+    return _auth_pool
 
 class AuthManager:
     def __init__(self):
@@ -16,19 +53,15 @@ class AuthManager:
         self._keep_alive = False  # Flag to prevent automatic closure
         
     def _setup_driver(self):
-        """Setup Chrome driver with appropriate options"""
-        chrome_options = Options()
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        
-        self.driver = webdriver.Chrome(options=chrome_options)
-        self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        """Check out a Chrome driver for login from the shared pool"""
+        self.driver = get_auth_driver_pool().acquire(timeout=30)
         
     def start_spotify_auth(self) -> str:
         """Start Spotify authentication process"""
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+        
         if not self.driver:
             self._setup_driver()
             
@@ -47,6 +80,8 @@ class AuthManager:
         
     def complete_spotify_auth(self) -> bool:
         """Complete Spotify authentication and extract cookies"""
+        from selenium.webdriver.support.ui import WebDriverWait
+        
         try:
             print("Waiting for Spotify authentication to complete...")
             
@@ -87,6 +122,10 @@ class AuthManager:
             
     def start_ytm_auth(self) -> str:
         """Start YouTube Music authentication process"""
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+        
         if not self.driver:
             self._setup_driver()
             
@@ -105,6 +144,8 @@ class AuthManager:
         
     def complete_ytm_auth(self) -> bool:
         """Complete YouTube Music authentication and extract cookies"""
+        from selenium.webdriver.support.ui import WebDriverWait
+        
         try:
             print("Waiting for YouTube Music authentication to complete...")
             
@@ -172,13 +213,13 @@ class AuthManager:
     def close_driver(self):
         """Close the browser driver"""
         if self.driver and not self._keep_alive:
-            self.driver.quit()
+            get_auth_driver_pool().release(self.driver, discard=True)
             self.driver = None
             
     def force_close_driver(self):
         """Force close the browser driver regardless of keep_alive flag"""
         if self.driver:
-            self.driver.quit()
+            get_auth_driver_pool().release(self.driver, discard=True)
             self.driver = None
             self._keep_alive = False
             
@@ -0,0 +1,312 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from catalog_index import CatalogIndex, build_index
+from confirmed_matches import ConfirmedMatches
+from converter import Converter
+from fetch_ytm import YTMFetcher
+from match_cache import MatchCache
+from match_engine import MatchEngine
+from scoring import ParallelScorer
+from tracks import Track
+
+DEFAULT_BASELINE = "bench_baseline.json"
+
+WORDS = (
+    "love night heart fire dream summer rain dance light city blue gold river road home "
+    "wild girl boy money time world star sky ocean shadow ghost angel devil paradise "
+    "midnight sunrise echo storm thunder silence memory forever tonight yesterday alone"
+).split()
+FIRST = "Luna Max Nova Kai Mila Leo Zara Omar Ivy Remy Sasha Theo Ayla Niko Jade".split()
+LAST = "Rivers Stone Vega Hart Blake Cruz Moon Reyes Lowe Fox Kane Wolfe Ortiz".split()
+SUFFIXES = (" - Remastered 2011", " (Live)", " - Radio Edit", " (Acoustic)", " [Explicit]")
+
+def _title(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))).title()
+
+def _noisy(rng: random.Random, text: str) -> str:
+    """How the same string tends to differ between platforms"""
+    roll = rng.random()
+    if roll < 0.15:
+        return text + rng.choice(SUFFIXES)
+    if roll < 0.25:
+        return text.lower()
+    if roll < 0.32 and len(text) > 3:
+        # Typo: swap two neighbouring characters
+        i = rng.randrange(len(text) - 1)
+        return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+    if roll < 0.37:
+        return text.replace("e", "é", 1)
+    return text
+
+def make_library(size: int, seed: int = 42) -> List[Track]:
+    """Synthetic source tracks; artists follow a long tail and ~5% of tracks are duplicates"""
+    rng = random.Random(seed)
+    artists = [f"{rng.choice(FIRST)} {rng.choice(LAST)}" for _ in range(max(size // 20, 10))]
+    tracks = []
+    for i in range(size):
+        if tracks and rng.random() < 0.05:
+            tracks.append(rng.choice(tracks).replace(id=f"track_{i}"))
+            continue
+        artist = artists[min(int(rng.paretovariate(1.2)) - 1, len(artists) - 1)]
+        feature = f" (feat. {rng.choice(artists)})" if rng.random() < 0.1 else ""
+        tracks.append(Track(
+            title=_title(rng) + feature,
+            artist=artist,
+            album=_title(rng),
+            duration_ms=rng.randint(120000, 360000),
+            type="track",
+            id=f"track_{i}"
+        ))
+    return tracks
+
+class FakeYTMFetcher:
+    """Stands in for YTMFetcher.search_track: sleeps ``latency`` seconds and returns
+    a noisy copy of the query plus decoys, ~3% of queries find nothing"""
+
+    def __init__(self, latency: float = 0.0, seed: int = 7):
+        self.latency = latency
+        self.seed = seed
+
+    def search_track(self, title: str, artist: str, limit: int = 5) -> List[Dict]:
+        rng = random.Random(f"{self.seed}|{title}|{artist}")
+        if self.latency:
+            time.sleep(self.latency)
+        if rng.random() < 0.03:
+            return []
+        candidates = [{"title": _title(rng), "artist": artist, "id": f"decoy_{i}"} for i in range(limit - 1)]
+        candidates.insert(rng.randrange(limit), {
+            "title": _noisy(rng, title),
+            "artist": _noisy(rng, artist),
+            "id": f"yt_{rng.randrange(10 ** 11)}"
+        })
+        return candidates
+
+class _TimedMatchEngine(MatchEngine):
+    """Records the duration of every single-track lookup"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.samples: List[float] = []
+
+    def _match_single_track(self, track: Dict, target_platform: str) -> Optional[Dict]:
+        start = time.perf_counter()
+        try:
+            return super()._match_single_track(track, target_platform)
+        finally:
+            self.samples.append(time.perf_counter() - start)
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)] if ordered else 0.0
+
+# Timed passes per benchmark; the fastest is reported, the others only absorb warmup and noise
+REPEATS = 3
+
+def _measure(run: Callable[[], List[float]], items: int) -> Dict:
+    """Time ``run`` (which returns per-operation latencies), then rerun it under tracemalloc for peak memory"""
+    elapsed, samples = float("inf"), []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        pass_samples = run()
+        pass_elapsed = time.perf_counter() - start
+        if pass_elapsed < elapsed:
+            elapsed, samples = pass_elapsed, pass_samples
+
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "items": items,
+        "seconds": round(elapsed, 4),
+        "throughput": round(items / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(_percentile(samples, 50) * 1000, 4),
+        "p99_ms": round(_percentile(samples, 99) * 1000, 4),
+        "peak_mb": round(peak / 1024 / 1024, 2)
+    }
+
+def bench_match(tracks: List[Dict], latency: float, workers: int) -> Dict:
+    fetcher = FakeYTMFetcher(latency)
+
+    def run() -> List[float]:
+        # A fresh in-memory cache each run, so every unique track is searched
+        engine = _TimedMatchEngine(max_workers=workers, cache=MatchCache(":memory:"),
+                                   confirmed=ConfirmedMatches(":memory:"))
+        engine.ytm_fetcher = fetcher
+        engine.match_tracks(tracks, "spotify", "ytm")
+        return engine.samples
+
+    return _measure(run, len(tracks))
+
+def bench_convert(matches: List[Dict], repeats: int = 5) -> Dict:
+    converter = Converter()
+
+    def run() -> List[float]:
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            converter.create_playlist_data(matches, "ytm")
+            # Per-track cost of one whole call
+            samples.append((time.perf_counter() - start) / max(len(matches), 1))
+        return samples
+
+    return _measure(run, len(matches) * repeats)
+
+def bench_normalize(tracks: List[Dict]) -> Dict:
+    converter = Converter()
+
+    def run() -> List[float]:
+        samples = []
+        clock = time.perf_counter
+        for track in tracks:
+            start = clock()
+            converter.normalize_track_data(track, "spotify")
+            samples.append(clock() - start)
+        return samples
+
+    return _measure(run, len(tracks))
+
+def bench_parse(tracks: List[Dict], page_size: int = 100) -> Dict:
+    """YTMFetcher.iter_playlist_tracks over raw ytmusicapi-shaped pages"""
+    raw = [
+        {"title": t["title"], "artists": [{"name": t["artist"], "id": None}], "videoId": t["id"],
+         "setVideoId": t["id"], "album": {"name": t["album"]}, "duration_seconds": t["duration_ms"] // 1000}
+        for t in tracks
+    ]
+    pages = [raw[i:i + page_size] for i in range(0, len(raw), page_size)]
+    fetcher = YTMFetcher()
+    fetcher.iter_playlist_pages = lambda playlist_id: iter(pages)
+
+    def run() -> List[float]:
+        # Per-track cost of each parsed page
+        samples = []
+        iterator = fetcher.iter_playlist_tracks("PL")
+        while True:
+            start = time.perf_counter()
+            page = next(iterator, None)
+            if page is None:
+                return samples
+            samples.append((time.perf_counter() - start) / max(len(page), 1))
+
+    return _measure(run, len(tracks))
+
+def bench_score(tracks: List[Dict], scoring_workers: int, queries: int = 10000) -> Dict:
+    """ParallelScorer.score_rows for up to ``queries`` tracks against a catalog of noisy copies of ``tracks``"""
+    rng = random.Random(11)
+    index_dir = tempfile.mkdtemp(prefix="bench_catalog_")
+    try:
+        source = os.path.join(index_dir, "catalog.jsonl")
+        with open(source, "w", encoding="utf-8") as f:
+            for t in tracks:
+                f.write(json.dumps({"title": _noisy(rng, t["title"]), "artist": t["artist"], "id": t["id"]}) + "\n")
+        build_index(source, index_dir, "ytm")
+        catalog = CatalogIndex(index_dir)
+
+        pairs = [(t["title"], t["artist"]) for t in tracks[:queries]]
+        row_lists = [catalog.search_rows(title, artist) for title, artist in pairs]
+        # Every batch goes to the worker processes, however small
+        scorer = ParallelScorer(workers=scoring_workers, min_pairs=0)
+        scorer.score_rows(catalog, pairs[:1], row_lists[:1])  # Start the workers outside the timing
+
+        def run() -> List[float]:
+            start = time.perf_counter()
+            scorer.score_rows(catalog, pairs, row_lists)
+            return [(time.perf_counter() - start) / max(len(pairs), 1)]
+
+        try:
+            return _measure(run, len(pairs))
+        finally:
+            scorer.close()
+    finally:
+        shutil.rmtree(index_dir, ignore_errors=True)
+
+def run_benchmarks(sizes: List[int], latency: float, workers: int, match_limit: int,
+                   scoring_workers: int = 1) -> Dict[str, Dict]:
+    results = {}
+    for size in sizes:
+        tracks = make_library(size)
+        print(f"== {size} tracks")
+
+        if size <= match_limit:
+            results[f"match_tracks@{size}"] = bench_match(tracks, latency, workers)
+        else:
+            print(f"   match_tracks skipped above --match-limit {match_limit}")
+
+        # Converter input: matches built without searching
+        engine = MatchEngine(cache=MatchCache(":memory:"), confirmed=ConfirmedMatches(":memory:"))
+        matches = [
+            engine._build_match_entry(t, {"title": t["title"], "artist": t["artist"], "id": t["id"], "confidence": 90.0})
+            for t in tracks
+        ]
+        results[f"create_playlist_data@{size}"] = bench_convert(matches)
+        results[f"normalize_track_data@{size}"] = bench_normalize(tracks)
+        results[f"ytm_parse@{size}"] = bench_parse(tracks)
+        results[f"score_catalog@{size}"] = bench_score(tracks, scoring_workers)
+
+        for name in [n for n in results if n.endswith(f"@{size}")]:
+            r = results[name]
+            print(f"   {name:32} {r['throughput']:>12.1f}/s  p50 {r['p50_ms']:.4f}ms  "
+                  f"p99 {r['p99_ms']:.4f}ms  peak {r['peak_mb']:.2f}MB")
+    return results
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """Print the change against the baseline, returns the names that regressed beyond ``tolerance``"""
+    regressions = []
+    print(f"== compared with baseline (tolerance {tolerance:.0%})")
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        changes = {
+            "throughput": (current["throughput"] - previous["throughput"]) / previous["throughput"]
+            if previous["throughput"] else 0.0,
+            "p99_ms": (current["p99_ms"] - previous["p99_ms"]) / previous["p99_ms"] if previous["p99_ms"] else 0.0,
+            "peak_mb": (current["peak_mb"] - previous["peak_mb"]) / previous["peak_mb"] if previous["peak_mb"] else 0.0
+        }
+        worse = changes["throughput"] < -tolerance or changes["p99_ms"] > tolerance or changes["peak_mb"] > tolerance
+        if worse:
+            regressions.append(name)
+        print(f"   {name:32} throughput {changes['throughput']:+.1%}  p99 {changes['p99_ms']:+.1%}  "
+              f"peak {changes['peak_mb']:+.1%}{'  REGRESSION' if worse else ''}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark matching, conversion and fetch parsing on synthetic libraries")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma separated library sizes")
+    parser.add_argument("--latency", type=float, default=0.002, help="Seconds each fake search takes")
+    parser.add_argument("--workers", type=int, default=8, help="MatchEngine worker threads")
+    parser.add_argument("--scoring-workers", type=int, default=os.cpu_count() or 1,
+                        help="Processes scoring catalog candidates")
+    parser.add_argument("--match-limit", type=int, default=100000, help="Largest size to run match_tracks on")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--repeats", type=int, default=REPEATS, help="Timed passes per benchmark, the fastest counts")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown before failing")
+    args = parser.parse_args()
+    REPEATS = max(args.repeats, 1)
+
+    results = run_benchmarks([int(s) for s in args.sizes.split(",")], args.latency, args.workers, args.match_limit,
+                             args.scoring_workers)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            if compare(results, json.load(f), args.tolerance):
+                sys.exit(1)
+    else:
+        print(f"No baseline at {args.baseline}, run with --save-baseline to create one")
@@ -0,0 +1,207 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import threading
+from array import array
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from match_cache import normalize_text
+
+FIELD_SEP = "\x1f"
+INDEX_VERSION = 1
+
+def _token_hash(token: str) -> int:
+    """Stable 64-bit hash of a token (Python's hash() is salted per process)"""
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+
+def tokenize(text: str) -> List[str]:
+    """Unique normalized word tokens of a title/artist string"""
+    return list(dict.fromkeys(normalize_text(text).split()))
+
+def _read_rows(source_path: str) -> Iterator[Dict]:
+    """Yield catalog rows from a CSV (with header) or JSONL file"""
+    with open(source_path, "r", encoding="utf-8", newline="") as f:
+        if source_path.endswith((".jsonl", ".json")):
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+def build_index(source_path: str, output_dir: str, platform: str) -> int:
+    """Build an on-disk catalog index from a CSV/JSONL export, returns the row count
+
+    Layout of ``output_dir``:
+      strings.bin        UTF-8 "title<US>artist<US>id" records, back to back
+      offsets.npy        uint64 start offset of every record (plus end sentinel)
+      token_hashes.npy   sorted uint64 hashes of every distinct token
+      token_offsets.npy  uint64 start of each token's postings (plus end sentinel)
+      postings.npy       uint32 row ids, grouped by token and sorted by row
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    offsets = array("Q", [0])
+    pair_hashes = array("Q")
+    pair_rows = array("I")
+    position = 0
+    count = 0
+
+    with open(os.path.join(output_dir, "strings.bin"), "wb") as blob:
+        for row in _read_rows(source_path):
+            title = (row.get("title") or "").replace(FIELD_SEP, " ")
+            artist = (row.get("artist") or "").replace(FIELD_SEP, " ")
+            track_id = str(row.get("id") or "")
+            if not title or not track_id:
+                continue
+
+            record = FIELD_SEP.join((title, artist, track_id)).encode("utf-8")
+            blob.write(record)
+            position += len(record)
+            offsets.append(position)
+
+            for token in tokenize(f"{title} {artist}"):
+                pair_hashes.append(_token_hash(token))
+                pair_rows.append(count)
+            count += 1
+
+    hashes = np.frombuffer(pair_hashes, dtype=np.uint64)
+    rows = np.frombuffer(pair_rows, dtype=np.uint32)
+    # Stable sort keeps each token's postings in row order
+    order = np.argsort(hashes, kind="stable")
+    sorted_hashes = hashes[order]
+    token_hashes, starts = np.unique(sorted_hashes, return_index=True)
+    token_offsets = np.append(starts, len(sorted_hashes)).astype(np.uint64)
+
+    np.save(os.path.join(output_dir, "offsets.npy"), np.frombuffer(offsets, dtype=np.uint64))
+    np.save(os.path.join(output_dir, "token_hashes.npy"), token_hashes)
+    np.save(os.path.join(output_dir, "token_offsets.npy"), token_offsets)
+    np.save(os.path.join(output_dir, "postings.npy"), rows[order])
+
+    with open(os.path.join(output_dir, "meta.json"), "w") as f:
+        json.dump({
+            "version": INDEX_VERSION,
+            "platform": platform,
+            "rows": count,
+            "tokens": int(len(token_hashes))
+        }, f)
+
+    return count
+
+class CatalogIndex:
+    """Read-only, memory-mapped catalog of target-platform tracks
+
+    Nothing is loaded up front: every array is mapped from disk, so opening
+    is constant time and lookups only page in the postings and records they
+    touch, even when the catalog is much larger than RAM.
+    """
+
+    def __init__(self, index_dir: str, max_postings: int = 50000):
+        self.index_dir = index_dir
+        # Tokens matching more rows than this (e.g. "the", "remix") are skipped
+        self.max_postings = max_postings
+
+        with open(os.path.join(index_dir, "meta.json"), "r") as f:
+            meta = json.load(f)
+        if meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported catalog index version: {meta.get('version')}")
+
+        self.platform = meta["platform"]
+        self.rows = meta["rows"]
+        # np.memmap refuses empty files, which an empty catalog produces
+        if self.rows:
+            self._strings = np.memmap(os.path.join(index_dir, "strings.bin"), dtype=np.uint8, mode="r")
+        else:
+            self._strings = np.zeros(0, dtype=np.uint8)
+        self._offsets = np.load(os.path.join(index_dir, "offsets.npy"), mmap_mode="r")
+        self._token_hashes = np.load(os.path.join(index_dir, "token_hashes.npy"), mmap_mode="r")
+        self._token_offsets = np.load(os.path.join(index_dir, "token_offsets.npy"), mmap_mode="r")
+        self._postings = np.load(os.path.join(index_dir, "postings.npy"), mmap_mode="r")
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def get_row(self, row: int) -> Dict:
+        """Decode a single catalog record"""
+        start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+        title, artist, track_id = self._strings[start:end].tobytes().decode("utf-8").split(FIELD_SEP)
+        return {"title": title, "artist": artist, "id": track_id}
+
+    def get_fields(self, rows: np.ndarray) -> List[List[str]]:
+        """Decode many records at once as [title, artist, id] lists"""
+        rows = np.asarray(rows, dtype=np.int64)
+        # Two vectorized lookups instead of two memmap indexing calls per row
+        starts, ends = self._offsets[rows], self._offsets[rows + 1]
+        strings = memoryview(self._strings)
+        return [
+            bytes(strings[start:end]).decode("utf-8").split(FIELD_SEP)
+            for start, end in zip(starts.tolist(), ends.tolist())
+        ]
+
+    def _postings_for(self, token: str) -> Optional[np.ndarray]:
+        """Row ids containing a token, or None if the token is unknown"""
+        token_hash = np.uint64(_token_hash(token))
+        pos = int(np.searchsorted(self._token_hashes, token_hash))
+        if pos >= len(self._token_hashes) or self._token_hashes[pos] != token_hash:
+            return None
+        return self._postings[int(self._token_offsets[pos]):int(self._token_offsets[pos + 1])]
+
+    def search(self, title: str, artist: str, limit: int = 50) -> List[Dict]:
+        """Return up to ``limit`` rows sharing the most tokens with the query"""
+        return [
+            {"title": title, "artist": artist, "id": track_id}
+            for title, artist, track_id in self.get_fields(self.search_rows(title, artist, limit))
+        ]
+
+    def search_rows(self, title: str, artist: str, limit: int = 50) -> np.ndarray:
+        """Row ids of ``search``, without decoding the records"""
+        postings = [p for p in (self._postings_for(t) for t in tokenize(f"{title} {artist}")) if p is not None]
+        if not postings:
+            return np.zeros(0, dtype=np.uint32)
+
+        # Very common tokens only add noise; keep them if nothing else matched
+        selective = [p for p in postings if len(p) <= self.max_postings]
+        if selective:
+            postings = selective
+        else:
+            postings = [min(postings, key=len)[:self.max_postings]]
+
+        rows, counts = np.unique(np.concatenate(postings), return_counts=True)
+        if len(rows) > limit:
+            # Most shared tokens first, ties broken by row order
+            rows = rows[np.argsort(-counts, kind="stable")[:limit]]
+
+        return rows.astype(np.uint32, copy=False)
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+def get_catalog(target_platform: str) -> Optional[CatalogIndex]:
+    """Return the shared catalog for a platform, from MATCH_CATALOG_<PLATFORM> (e.g. MATCH_CATALOG_YTM)"""
+    index_dir = os.environ.get(f"MATCH_CATALOG_{target_platform.upper()}")
+    if not index_dir:
+        return None
+
+    with _catalogs_lock:
+        if index_dir not in _catalogs:
+            try:
+                _catalogs[index_dir] = CatalogIndex(index_dir)
+            except Exception as e:
+                print(f"Error opening catalog index {index_dir}: {e}")
+                _catalogs[index_dir] = None
+        return _catalogs[index_dir]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a local catalog index for offline matching")
+    parser.add_argument("source", help="CSV (title,artist,id header) or JSONL export of the catalog")
+    parser.add_argument("output", help="Directory to write the index to")
+    parser.add_argument("--platform", choices=["spotify", "ytm"], required=True,
+                        help="Platform the catalog ids belong to")
+    args = parser.parse_args()
+
+    rows = build_index(args.source, args.output, args.platform)
+    print(f"Indexed {rows} tracks into {args.output}")
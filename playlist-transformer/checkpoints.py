@@ -0,0 +1,69 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+DEFAULT_CHECKPOINT_PATH = os.environ.get("SYNC_STATE_PATH", "sync_state.db")
+# Seconds an unfinished write can be resumed; older ones start over in a new playlist
+CHECKPOINT_TTL = float(os.environ.get("WRITE_CHECKPOINT_TTL", 7 * 24 * 3600))
+
+def write_key(platform: str, name: str, track_ids: List[str]) -> str:
+    """Identify a playlist write by its content, so a retry of the same conversion finds its checkpoint"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{platform}\x1f{name}".encode("utf-8"))
+    for track_id in track_ids:
+        digest.update(b"\x1f" + track_id.encode("utf-8"))
+    return digest.hexdigest()
+
+class WriteCheckpoints:
+    """Progress of chunked playlist writes, kept in SQLite until the write completes"""
+
+    def __init__(self, path: str = DEFAULT_CHECKPOINT_PATH, ttl: float = CHECKPOINT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS playlist_writes ("
+            "write_key TEXT PRIMARY KEY, playlist_id TEXT, committed INTEGER, updated_at REAL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[str, int]]:
+        """Return (playlist_id, tracks committed so far) of an unfinished write, None if none or expired"""
+        with self._lock:
+            # Expired checkpoints go first: their playlist may be long gone
+            self._conn.execute("DELETE FROM playlist_writes WHERE updated_at < ?", (time.time() - self.ttl,))
+            self._conn.commit()
+            row = self._conn.execute(
+                "SELECT playlist_id, committed FROM playlist_writes WHERE write_key = ?", (key,)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def save(self, key: str, playlist_id: str, committed: int):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO playlist_writes VALUES (?, ?, ?, ?)",
+                (key, playlist_id, committed, time.time())
+            )
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM playlist_writes WHERE write_key = ?", (key,))
+            self._conn.commit()
+
+_checkpoints = None
+_checkpoints_lock = threading.Lock()
+
+def get_write_checkpoints() -> WriteCheckpoints:
+    """Return the process-wide checkpoint store, opening it on first use"""
+    global _checkpoints
+    if _checkpoints is None:
+        with _checkpoints_lock:
+            if _checkpoints is None:
+                _checkpoints = WriteCheckpoints()
+    return _checkpoints
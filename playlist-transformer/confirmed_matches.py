@@ -0,0 +1,130 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from match_cache import normalize_text
+
+DEFAULT_CONFIRMED_PATH = os.environ.get("CONFIRMED_MATCHES_PATH", "confirmed_matches.db")
+
+# Platforms report the same recording a second or two apart
+DURATION_BUCKET_SECONDS = 3
+# Exact-key tiers, tried in this order before fuzzy search
+TIERS = ("isrc", "key")
+
+def duration_bucket(duration_ms: Optional[int]) -> Optional[int]:
+    """Duration rounded to DURATION_BUCKET_SECONDS, None when unknown"""
+    if not duration_ms:
+        return None
+    return round(duration_ms / 1000 / DURATION_BUCKET_SECONDS)
+
+def _track_key(title: str, artist: str, bucket: int, target_platform: str) -> str:
+    return f"key|{target_platform}|{normalize_text(title)}|{normalize_text(artist)}|{bucket}"
+
+def exact_keys(track: Dict, target_platform: str, neighbours: bool = True) -> List[Tuple[str, str]]:
+    """(tier, key) pairs to look a source track up by, most specific first
+
+    The ISRC identifies a recording across platforms. Without one, the
+    normalized title and artist plus duration bucket stand in; with
+    ``neighbours`` the adjacent buckets are included too, so durations that
+    straddle a bucket edge still meet.
+    """
+    keys = []
+    isrc = (track.get("isrc") or "").strip().upper()
+    if isrc:
+        keys.append(("isrc", f"isrc|{target_platform}|{isrc}"))
+    bucket = duration_bucket(track.get("duration_ms"))
+    if bucket is not None and track.get("title"):
+        for offset in ((0, -1, 1) if neighbours else (0,)):
+            keys.append(("key", _track_key(track.get("title", ""), track.get("artist", ""), bucket + offset, target_platform)))
+    return keys
+
+class ConfirmedMatches:
+    """Index of matches users confirmed by creating a playlist, keyed by ISRC and by title/artist/duration
+
+    MatchEngine resolves a track here before searching; a hit skips the
+    network search and fuzzy scoring altogether.
+    """
+
+    def __init__(self, path: str = DEFAULT_CONFIRMED_PATH):
+        self.path = path
+        self.lookups = 0
+        self.hits = {tier: 0 for tier in TIERS}
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS confirmed (key TEXT PRIMARY KEY, result TEXT, confirmed_at REAL)"
+        )
+        self._conn.commit()
+
+    def lookup_many(self, tracks: List[Dict], target_platform: str) -> List[Tuple[Optional[str], Optional[Dict]]]:
+        """(tier, result) of every track, (None, None) for tracks that need a fuzzy search"""
+        track_keys = [exact_keys(track, target_platform) for track in tracks]
+        wanted = list({key for keys in track_keys for _, key in keys})
+
+        found: Dict[str, str] = {}
+        with self._lock:
+            try:
+                # Chunked to stay under SQLite's bound parameter limit
+                for start in range(0, len(wanted), 500):
+                    chunk = wanted[start:start + 500]
+                    rows = self._conn.execute(
+                        f"SELECT key, result FROM confirmed WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                    ).fetchall()
+                    found.update(rows)
+            except sqlite3.Error as e:
+                print(f"Error reading confirmed matches: {e}")
+
+            results = []
+            for keys in track_keys:
+                tier, result = next(((tier, found[key]) for tier, key in keys if key in found), (None, None))
+                if tier:
+                    self.hits[tier] += 1
+                results.append((tier, json.loads(result) if result else None))
+            self.lookups += len(tracks)
+        return results
+
+    def record_many(self, pairs: List[Tuple[Dict, Dict]], target_platform: str):
+        """Store confirmed (source track, target result) pairs under every exact key of the source track"""
+        now = time.time()
+        rows = []
+        for track, result in pairs:
+            value = json.dumps({
+                "title": result.get("title", ""),
+                "artist": result.get("artist", ""),
+                "id": result.get("id", "")
+            })
+            rows.extend((key, value, now) for _, key in exact_keys(track, target_platform, neighbours=False))
+
+        with self._lock:
+            try:
+                self._conn.executemany("INSERT OR REPLACE INTO confirmed VALUES (?, ?, ?)", rows)
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"Error writing confirmed matches: {e}")
+
+    def stats(self) -> Dict:
+        """Lookups and hit rate per tier"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM confirmed").fetchone()[0]
+            stats = {"entries": entries, "lookups": self.lookups}
+            for tier, hits in self.hits.items():
+                stats[f"{tier}_hits"] = hits
+                stats[f"{tier}_hit_rate"] = round(hits / self.lookups, 3) if self.lookups else 0.0
+        return stats
+
+_confirmed = None
+_confirmed_lock = threading.Lock()
+
+def get_confirmed_matches() -> ConfirmedMatches:
+    """Return the process-wide confirmed match index, opening it on first use"""
+    global _confirmed
+    if _confirmed is None:
+        with _confirmed_lock:
+            if _confirmed is None:
+                _confirmed = ConfirmedMatches()
+    return _confirmed
@@ -1,5 +1,6 @@
 from typing import Dict, List
 import json
+from tracks import MatchEntry
 
 class Converter:
     def __init__(self):
@@ -26,38 +27,42 @@ class Converter:
         }
         
         for track in matched_tracks:
-            if track.get("status") in ["matched", "low_confidence"]:
+            # Entries from MatchEngine already are MatchEntry, plain dicts are converted once here
+            track = MatchEntry.from_dict(track)
+            if track.status in ("matched", "low_confidence"):
                 converted_track = self._convert_track_format(track, target_platform)
                 if converted_track:
                     playlist_data["tracks"].append(converted_track)
                     
         return playlist_data
         
-    def _convert_track_format(self, track: Dict, target_platform: str) -> Dict:
+    def _convert_track_format(self, track: MatchEntry, target_platform: str) -> Dict:
         """Convert track data to target platform format"""
         if target_platform == "spotify":
             return self._to_spotify_format(track)
         else:  # ytm
             return self._to_ytm_format(track)
             
-    def _to_spotify_format(self, track: Dict) -> Dict:
+    def _to_spotify_format(self, track: MatchEntry) -> Dict:
         """Convert track to Spotify format"""
+        matched_id = track.matched_id or ""
         return {
-            "id": track.get("matched_id", ""),
-            "title": track.get("matched_title", track.get("original_title", "")),
-            "artist": track.get("matched_artist", track.get("original_artist", "")),
-            "spotify_id": track.get("matched_id", ""),
-            "url": f"https://open.spotify.com/track/{track.get('matched_id', '')}" if track.get("matched_id") else ""
+            "id": matched_id,
+            "title": track.matched_title or track.original_title or "",
+            "artist": track.matched_artist or track.original_artist or "",
+            "spotify_id": matched_id,
+            "url": f"https://open.spotify.com/track/{matched_id}" if matched_id else ""
         }
         
-    def _to_ytm_format(self, track: Dict) -> Dict:
+    def _to_ytm_format(self, track: MatchEntry) -> Dict:
         """Convert track to YouTube Music format"""
+        matched_id = track.matched_id or ""
         return {
-            "id": track.get("matched_id", ""),
-            "title": track.get("matched_title", track.get("original_title", "")),
-            "artist": track.get("matched_artist", track.get("original_artist", "")),
-            "ytm_id": track.get("matched_id", ""),
-            "url": f"https://music.youtube.com/watch?v={track.get('matched_id', '')}" if track.get("matched_id") else ""
+            "id": matched_id,
+            "title": track.matched_title or track.original_title or "",
+            "artist": track.matched_artist or track.original_artist or "",
+            "ytm_id": matched_id,
+            "url": f"https://music.youtube.com/watch?v={matched_id}" if matched_id else ""
         }
         
     def normalize_track_data(self, track: Dict, source_platform: str) -> Dict:
@@ -0,0 +1,242 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+def _default_health_check(driver) -> bool:
+    """A driver is healthy if its browser still answers"""
+    driver.current_url
+    return True
+
+class _PooledDriver:
+    __slots__ = ("driver", "uses", "last_used", "generation")
+
+    def __init__(self, driver, generation: int):
+        self.driver = driver
+        self.uses = 0
+        self.last_used = time.time()
+        self.generation = generation
+
+class DriverPool:
+    """Bounded pool of warm WebDriver instances
+
+    Drivers are created by ``factory`` (which also primes them, e.g. with
+    cookies), handed out with acquire() and given back with release().
+    A driver is quit instead of reused once it has served ``max_uses``
+    checkouts, sat idle longer than ``idle_timeout`` seconds, failed its
+    health check, or was created before the last invalidate(). ``min_idle``
+    drivers are kept started in the background so checkouts do not pay the
+    browser cold start.
+    """
+
+    def __init__(self, factory: Callable[[], object], max_size: int = 2, max_uses: int = 50,
+                 idle_timeout: float = 300, min_idle: int = 0,
+                 health_check: Callable[[object], bool] = _default_health_check,
+                 name: str = "driver"):
+        self.factory = factory
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.idle_timeout = idle_timeout
+        self.min_idle = min(min_idle, max_size)
+        self.health_check = health_check
+        self.name = name
+
+        self._idle: List[_PooledDriver] = []
+        self._in_use: Dict[int, _PooledDriver] = {}
+        self._live = 0  # idle + in use + being created
+        self._warming = 0  # being created by _fill_min_idle
+        self._generation = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self.created = 0
+        self.recycled = 0
+        self.health_check_failures = 0
+
+    def acquire(self, timeout: Optional[float] = None):
+        """Check out a driver, waiting up to ``timeout`` seconds if the pool is exhausted"""
+        deadline = None if timeout is None else time.time() + timeout
+
+        while True:
+            entry = None
+            create = False
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError(f"{self.name} pool is closed")
+                stale = self._take_stale_locked()
+
+                if self._idle:
+                    # Most recently used first, it is the warmest
+                    entry = self._idle.pop()
+                elif self._live < self.max_size:
+                    self._live += 1
+                    create = True
+                else:
+                    remaining = None if deadline is None else deadline - time.time()
+                    if remaining is not None and remaining <= 0:
+                        self._quit_all(stale)
+                        raise TimeoutError(f"No {self.name} available after {timeout}s")
+                    self._cond.wait(remaining)
+
+            self._quit_all(stale)
+
+            if create:
+                entry = self._create()
+            elif entry is None or not self._is_healthy(entry):
+                continue
+
+            with self._cond:
+                self._in_use[id(entry.driver)] = entry
+            self._fill_min_idle()
+            return entry.driver
+
+    def release(self, driver, discard: bool = False):
+        """Return a checked-out driver; ``discard`` quits it instead of pooling it"""
+        with self._cond:
+            entry = self._in_use.pop(id(driver), None)
+            if entry is None:
+                return
+            entry.uses += 1
+            entry.last_used = time.time()
+
+            retire = (discard or self._closed or entry.uses >= self.max_uses
+                      or entry.generation != self._generation)
+            if retire:
+                self._live -= 1
+                if not discard:
+                    self.recycled += 1
+            else:
+                self._idle.append(entry)
+            self._cond.notify()
+
+        if retire:
+            self._quit(entry.driver)
+            self._fill_min_idle()
+
+    @contextmanager
+    def driver(self, timeout: Optional[float] = None):
+        """Context manager around acquire()/release(); errors discard the driver"""
+        driver = self.acquire(timeout)
+        try:
+            yield driver
+        except Exception:
+            self.release(driver, discard=True)
+            raise
+        else:
+            self.release(driver)
+
+    def invalidate(self):
+        """Retire every existing driver, e.g. after the cookies they were primed with changed"""
+        with self._cond:
+            self._generation += 1
+            stale, self._idle = self._idle, []
+            self._live -= len(stale)
+            self.recycled += len(stale)
+            self._cond.notify_all()
+        self._quit_all(stale)
+        self._fill_min_idle()
+
+    def reap_idle(self):
+        """Quit drivers idle longer than idle_timeout"""
+        with self._cond:
+            stale = self._take_stale_locked()
+        self._quit_all(stale)
+
+    def close(self):
+        """Quit idle drivers now and in-use drivers as they are released"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._live -= len(idle)
+            self._cond.notify_all()
+        self._quit_all(idle)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "live": self._live,
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "max_size": self.max_size,
+                "created": self.created,
+                "recycled": self.recycled,
+                "health_check_failures": self.health_check_failures
+            }
+
+    def _take_stale_locked(self) -> List[_PooledDriver]:
+        """Remove idle drivers past idle_timeout (keeping min_idle), caller holds the lock"""
+        cutoff = time.time() - self.idle_timeout
+        stale = [e for e in self._idle if e.last_used < cutoff][:max(len(self._idle) - self.min_idle, 0)]
+        if stale:
+            self._idle = [e for e in self._idle if e not in stale]
+            self._live -= len(stale)
+            self.recycled += len(stale)
+            self._cond.notify_all()
+        return stale
+
+    def _create(self) -> _PooledDriver:
+        """Start a new driver for a slot already counted in _live"""
+        try:
+            driver = self.factory()
+        except Exception:
+            with self._cond:
+                self._live -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.created += 1
+            return _PooledDriver(driver, self._generation)
+
+    def _is_healthy(self, entry: _PooledDriver) -> bool:
+        """Health check a driver taken from the idle list, quitting it if it fails"""
+        try:
+            if self.health_check(entry.driver):
+                return True
+        except Exception as e:
+            print(f"{self.name} failed health check: {e}")
+        with self._cond:
+            self._live -= 1
+            self.health_check_failures += 1
+            self._cond.notify()
+        self._quit(entry.driver)
+        return False
+
+    def _fill_min_idle(self):
+        """Start drivers in the background until min_idle are waiting"""
+        with self._cond:
+            missing = min(self.min_idle - len(self._idle) - self._warming, self.max_size - self._live)
+            if self._closed or missing <= 0:
+                return
+            self._live += missing
+            self._warming += missing
+
+        def _warm():
+            try:
+                entry = self._create()
+            except Exception as e:
+                print(f"Error prewarming {self.name}: {e}")
+                with self._cond:
+                    self._warming -= 1
+                return
+            with self._cond:
+                self._warming -= 1
+                if self._closed:
+                    self._live -= 1
+                else:
+                    self._idle.append(entry)
+                    self._cond.notify()
+                    return
+            self._quit(entry.driver)
+
+        for _ in range(missing):
+            threading.Thread(target=_warm, name=f"{self.name}-prewarm", daemon=True).start()
+
+    def _quit(self, driver):
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"Error quitting {self.name}: {e}")
+
+    def _quit_all(self, entries: List[_PooledDriver]):
+        for entry in entries:
+            self._quit(entry.driver)
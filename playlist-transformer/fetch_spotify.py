@@ -1,39 +1,204 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
 import json
+import os
+import threading
 import time
-from typing import Dict, List, Optional
+from functools import partial
+from typing import Callable, Dict, List, Optional
 from auth_browser import AuthManager
+from checkpoints import get_write_checkpoints, write_key
+from driver_pool import DriverPool
+from metrics import STAGE_SECONDS
+from rate_limit import is_not_found, is_retryable
+from spotify_client import get_spotify_client
+from tracks import Track
+
+def _create_spotify_driver():
+    """Start a headless Chrome on open.spotify.com with the saved Spotify cookies"""
+    # Selenium is only imported once a browser is needed, it is slow to import
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    
+    chrome_options = Options()
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--headless")  # Run in background
+    
+    driver = webdriver.Chrome(options=chrome_options)
+    
+    # Load cookies
+    cookies = AuthManager().get_spotify_cookies()
+    if cookies:
+        driver.get("https://open.spotify.com")
+        for cookie in cookies:
+            try:
+                driver.add_cookie(cookie)
+            except:
+                pass
+                
+    return driver
+
+# Reads every matching row in one round trip: arguments are the row selector,
+# a {field: selector} map and an optional link selector for the item URI
+_EXTRACT_ROWS_JS = """
+const [rowSelector, fields, linkSelector] = arguments;
+const rows = Array.from(document.querySelectorAll(rowSelector)).map((row, position) => {
+    const item = {position: position, index: row.getAttribute('aria-rowindex') || ''};
+    for (const [name, selector] of Object.entries(fields)) {
+        const el = row.querySelector(selector);
+        item[name] = el ? el.innerText.trim() : '';
+    }
+    const link = linkSelector ? row.querySelector(linkSelector) : null;
+    item.href = link ? link.getAttribute('href') : '';
+    return item;
+});
+return JSON.stringify(rows);
+"""
+
+# Async script: calls back True as soon as the last rendered row changes
+# (new rows were rendered), or False after timeoutMs without a change
+_WAIT_FOR_NEW_ROWS_JS = """
+const [rowSelector, lastKey, timeoutMs, done] = arguments;
+const currentKey = () => {
+    const rows = document.querySelectorAll(rowSelector);
+    if (!rows.length) return '';
+    const last = rows[rows.length - 1];
+    return (last.getAttribute('aria-rowindex') || '') + '|' + rows.length + '|' + last.innerText.slice(0, 80);
+};
+if (currentKey() !== lastKey) { done(true); return; }
+const observer = new MutationObserver(() => {
+    if (currentKey() !== lastKey) { observer.disconnect(); clearTimeout(timer); done(true); }
+});
+observer.observe(document.body, {childList: true, subtree: true});
+const timer = setTimeout(() => { observer.disconnect(); done(false); }, timeoutMs);
+"""
+
+# Scrolls the last rendered row into view and returns the key _WAIT_FOR_NEW_ROWS_JS compares against
+_SCROLL_LAST_ROW_JS = """
+const rows = document.querySelectorAll(arguments[0]);
+if (!rows.length) return '';
+const last = rows[rows.length - 1];
+last.scrollIntoView({block: 'end'});
+return (last.getAttribute('aria-rowindex') || '') + '|' + rows.length + '|' + last.innerText.slice(0, 80);
+"""
+
+# Total row count the grid advertises (aria-rowcount includes the header row)
+_TOTAL_ROWS_JS = """
+const grid = document.querySelector('[role="grid"][aria-rowcount]');
+return grid ? parseInt(grid.getAttribute('aria-rowcount'), 10) - 1 : -1;
+"""
+
+TRACK_ROW_SELECTOR = "[data-testid='track-row']"
+
+TRACK_ROW_FIELDS = {
+    "title": "[data-testid='track-name']",
+    "artist": "[data-testid='track-artist']",
+    "album": "[data-testid='track-album']",
+    "duration": "[data-testid='track-duration']"
+}
+
+def _wait_for_element(driver, css_selector: str, timeout: float = 10):
+    """Wait until an element matching ``css_selector`` is on the page and return it"""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+    return WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.CSS_SELECTOR, css_selector)))
+
+def _uri_from_href(href: str) -> str:
+    """Turn an open.spotify.com link like /track/<id> into spotify:track:<id>"""
+    parts = [p for p in (href or "").split("?")[0].split("/") if p]
+    if len(parts) >= 2 and parts[-2] in ("track", "playlist", "album", "artist"):
+        return f"spotify:{parts[-2]}:{parts[-1]}"
+    return ""
+
+def _duration_ms(text: str) -> int:
+    """Parse an m:ss or h:mm:ss duration into milliseconds"""
+    try:
+        seconds = 0
+        for part in text.split(":"):
+            seconds = seconds * 60 + int(part)
+        return seconds * 1000
+    except ValueError:
+        return 0
+
+_driver_pool = None
+_driver_pool_lock = threading.Lock()
+
+def get_spotify_driver_pool() -> DriverPool:
+    """Shared pool of warm, cookie-primed headless drivers for SpotifyFetcher"""
+    global _driver_pool
+    if _driver_pool is None:
+        with _driver_pool_lock:
+            if _driver_pool is None:
+                _driver_pool = DriverPool(
+                    _create_spotify_driver,
+                    max_size=int(os.environ.get("SPOTIFY_DRIVER_POOL_SIZE", 2)),
+                    max_uses=int(os.environ.get("SPOTIFY_DRIVER_MAX_USES", 50)),
+                    idle_timeout=float(os.environ.get("SPOTIFY_DRIVER_IDLE_TIMEOUT", 300)),
+                    name="spotify driver"
+                )
+    return _driver_pool
 
 class SpotifyFetcher:
     def __init__(self):
         self.driver = None
         self.auth_manager = AuthManager()
+        # Scrape the web player instead of using the cookie-authenticated HTTP client
+        self.use_browser = os.environ.get("SPOTIFY_USE_BROWSER", "").lower() in ("1", "true", "yes")
         
     def _setup_driver_with_cookies(self):
-        """Setup driver and load Spotify cookies"""
-        chrome_options = Options()
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--headless")  # Run in background
-        
-        self.driver = webdriver.Chrome(options=chrome_options)
-        
-        # Load cookies
-        cookies = self.auth_manager.get_spotify_cookies()
-        if cookies:
-            self.driver.get("https://open.spotify.com")
-            for cookie in cookies:
-                try:
-                    self.driver.add_cookie(cookie)
-                except:
-                    pass
+        """Check out a warm driver with Spotify cookies loaded from the shared pool"""
+        self.driver = get_spotify_driver_pool().acquire()
+        
+    def _release_driver(self):
+        """Return the driver to the pool instead of quitting it"""
+        if self.driver:
+            get_spotify_driver_pool().release(self.driver)
+            self.driver = None
                     
     def get_library(self) -> Dict:
         """Fetch user's Spotify library including playlists, liked songs, etc."""
+        if not self.use_browser:
+            try:
+                return get_spotify_client().get_library()
+            except Exception as e:
+                print(f"Error fetching Spotify library over HTTP, falling back to browser: {e}")
+                
+        return self._get_library_from_browser()
+        
+    def library_sections(self) -> Dict[str, Callable[[], Dict]]:
+        """A fetch per library section, safe to run concurrently
+        
+        Lets callers show each section as soon as it arrives instead of
+        waiting for get_library. Over HTTP the sections share the client; a
+        section that falls back to the browser checks out its own pooled driver.
+        """
+        return {
+            name: partial(self._fetch_section, name)
+            for name in ("liked_songs", "playlists", "albums", "artists")
+        }
+        
+    def _fetch_section(self, name: str) -> Dict:
+        with STAGE_SECONDS.labels(f"library_spotify_{name}").time():
+            if not self.use_browser:
+                try:
+                    return getattr(get_spotify_client(), f"get_{name}")()
+                except Exception as e:
+                    print(f"Error fetching Spotify {name} over HTTP, falling back to browser: {e}")
+                    
+            fetcher = SpotifyFetcher()
+            fetcher._setup_driver_with_cookies()
+            try:
+                return {
+                    "liked_songs": fetcher._fetch_liked_songs,
+                    "playlists": fetcher._fetch_playlists,
+                    "albums": fetcher._fetch_saved_albums,
+                    "artists": fetcher._fetch_followed_artists
+                }[name]()
+            finally:
+                fetcher._release_driver()
+        
+    def _get_library_from_browser(self) -> Dict:
+        """Scrape the library from the web player"""
         self._setup_driver_with_cookies()
         
         library = {
@@ -46,128 +211,145 @@ class SpotifyFetcher:
         
         try:
             # Fetch liked songs
-            library["liked_songs"] = self._fetch_liked_songs()
+            with STAGE_SECONDS.labels("library_spotify_liked_songs").time():
+                library["liked_songs"] = self._fetch_liked_songs()
             
             # Fetch playlists
-            library["playlists"] = self._fetch_playlists()
+            with STAGE_SECONDS.labels("library_spotify_playlists").time():
+                library["playlists"] = self._fetch_playlists()
             
             # Fetch followed artists
-            library["artists"] = self._fetch_followed_artists()
+            with STAGE_SECONDS.labels("library_spotify_artists").time():
+                library["artists"] = self._fetch_followed_artists()
             
             # Fetch saved albums
-            library["albums"] = self._fetch_saved_albums()
+            with STAGE_SECONDS.labels("library_spotify_albums").time():
+                library["albums"] = self._fetch_saved_albums()
             
         except Exception as e:
             print(f"Error fetching Spotify library: {e}")
         finally:
-            if self.driver:
-                self.driver.quit()
+            self._release_driver()
                 
         return library
         
+    def _extract_rows(self, row_selector: str, fields: Dict[str, str], link_selector: str = "") -> List[Dict]:
+        """Extract every row matching row_selector with a single execute_script call"""
+        return json.loads(self.driver.execute_script(_EXTRACT_ROWS_JS, row_selector, fields, link_selector))
+        
+    def _extract_track_rows(self) -> List[Track]:
+        """Collect every track row of the open list: title, artist, album, duration and URI"""
+        tracks = []
+        for row in self._harvest_rows(TRACK_ROW_SELECTOR, TRACK_ROW_FIELDS, "a[href*='/track/']"):
+            tracks.append(Track(
+                title=row["title"],
+                artist=row["artist"],
+                album=row["album"],
+                duration_ms=_duration_ms(row["duration"]),
+                uri=_uri_from_href(row["href"])
+            ))
+        return tracks
+        
+    def _harvest_rows(self, row_selector: str, fields: Dict[str, str], link_selector: str = "",
+                      wait_timeout: float = 5.0, max_rounds: int = 10000) -> List[Dict]:
+        """Scroll through a virtualized list, collecting rows as they are rendered
+        
+        Spotify recycles rows that scroll out of view, so rows are extracted
+        after every scroll step and de-duplicated by row index (or URI). Each
+        step waits for the rendered rows to change instead of sleeping, and
+        stops once the grid's advertised total is reached or nothing new
+        renders within ``wait_timeout`` seconds.
+        """
+        collected: Dict[str, Dict] = {}
+        total = self.driver.execute_script(_TOTAL_ROWS_JS)
+        # Pooled drivers outlive this call, give the next user back the timeout it had
+        previous_timeout = self.driver.timeouts.script
+        self.driver.set_script_timeout(wait_timeout + 5)
+        try:
+            for _ in range(max_rounds):
+                for row in self._extract_rows(row_selector, fields, link_selector):
+                    key = row["index"] or row["href"] or f"{row.get('title', '')}|{row.get('artist', '')}"
+                    collected.setdefault(key, row)
+                
+                if total is not None and 0 <= total <= len(collected):
+                    break
+                
+                last_key = self.driver.execute_script(_SCROLL_LAST_ROW_JS, row_selector)
+                changed = self.driver.execute_async_script(
+                    _WAIT_FOR_NEW_ROWS_JS, row_selector, last_key, int(wait_timeout * 1000)
+                )
+                if not changed:
+                    break
+        finally:
+            self.driver.set_script_timeout(previous_timeout)
+                
+        rows = list(collected.values())
+        if rows and all(row["index"].isdigit() for row in rows):
+            rows.sort(key=lambda row: int(row["index"]))
+        return rows
+        
     def _fetch_liked_songs(self) -> Dict:
         """Fetch user's liked songs"""
         self.driver.get("https://open.spotify.com/collection/tracks")
-        time.sleep(3)
         
         liked_songs = {}
         
         # Wait for tracks to load
-        WebDriverWait(self.driver, 10).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "[data-testid='track-row']"))
-        )
-        
-        # Scroll to load more tracks
-        self._scroll_to_load_all()
+        _wait_for_element(self.driver, TRACK_ROW_SELECTOR)
         
-        # Extract track information
-        track_elements = self.driver.find_elements(By.CSS_SELECTOR, "[data-testid='track-row']")
-        
-        for i, element in enumerate(track_elements):
-            try:
-                title_elem = element.find_element(By.CSS_SELECTOR, "[data-testid='track-name']")
-                artist_elem = element.find_element(By.CSS_SELECTOR, "[data-testid='track-artist']")
-                
-                title = title_elem.text
-                artist = artist_elem.text
-                track_id = f"liked_{i}"
-                
-                liked_songs[track_id] = {
-                    "title": title,
-                    "artist": artist,
-                    "type": "liked_song",
-                    "id": track_id
-                }
-                
-            except Exception as e:
-                print(f"Error extracting track {i}: {e}")
-                continue
+        # Scroll through the list, collecting tracks as they render
+        for i, track in enumerate(self._extract_track_rows()):
+            track.type = "liked_song"
+            track.id = f"liked_{i}"
+            liked_songs[track.id] = track
                 
         return liked_songs
         
     def _fetch_playlists(self) -> Dict:
         """Fetch user's playlists"""
         self.driver.get("https://open.spotify.com/collection/playlists")
-        time.sleep(3)
         
         playlists = {}
         
         # Wait for playlists to load
-        WebDriverWait(self.driver, 10).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "[data-testid='playlist-card']"))
-        )
+        _wait_for_element(self.driver, "[data-testid='playlist-card']")
         
-        playlist_elements = self.driver.find_elements(By.CSS_SELECTOR, "[data-testid='playlist-card']")
+        # Read every card before navigating away, element handles go stale after that
+        cards = self._extract_rows(
+            "[data-testid='playlist-card']",
+            {"name": "[data-testid='playlist-name']"},
+            "a[href*='/playlist/']"
+        )
         
-        for i, element in enumerate(playlist_elements):
-            try:
-                name_elem = element.find_element(By.CSS_SELECTOR, "[data-testid='playlist-name']")
-                name = name_elem.text
-                playlist_id = f"playlist_{i}"
-                
-                playlists[playlist_id] = {
-                    "name": name,
-                    "type": "playlist",
-                    "id": playlist_id,
-                    "tracks": self._fetch_playlist_tracks(element)
-                }
-                
-            except Exception as e:
-                print(f"Error extracting playlist {i}: {e}")
-                continue
+        for i, card in enumerate(cards):
+            playlist_id = f"playlist_{i}"
+            playlists[playlist_id] = {
+                "name": card["name"],
+                "type": "playlist",
+                "id": playlist_id,
+                "uri": _uri_from_href(card["href"]),
+                "tracks": self._fetch_playlist_tracks(card["href"])
+            }
                 
         return playlists
         
-    def _fetch_playlist_tracks(self, playlist_element) -> List[Dict]:
+    def _fetch_playlist_tracks(self, playlist_href: str) -> List[Track]:
         """Fetch tracks from a specific playlist"""
         tracks = []
         
         try:
-            # Click on playlist to open it
-            playlist_element.click()
-            time.sleep(3)
+            if not playlist_href:
+                return tracks
+                
+            # Open the playlist page
+            self.driver.get(f"https://open.spotify.com{playlist_href}" if playlist_href.startswith("/") else playlist_href)
             
             # Wait for tracks to load
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "[data-testid='track-row']"))
-            )
+            _wait_for_element(self.driver, TRACK_ROW_SELECTOR)
             
-            track_elements = self.driver.find_elements(By.CSS_SELECTOR, "[data-testid='track-row']")
-            
-            for i, element in enumerate(track_elements):
-                try:
-                    title_elem = element.find_element(By.CSS_SELECTOR, "[data-testid='track-name']")
-                    artist_elem = element.find_element(By.CSS_SELECTOR, "[data-testid='track-artist']")
-                    
-                    tracks.append({
-                        "title": title_elem.text,
-                        "artist": artist_elem.text,
-                        "id": f"track_{i}"
-                    })
-                    
-                except Exception as e:
-                    print(f"Error extracting playlist track {i}: {e}")
-                    continue
+            for i, track in enumerate(self._extract_track_rows()):
+                track.id = f"track_{i}"
+                tracks.append(track)
                     
         except Exception as e:
             print(f"Error fetching playlist tracks: {e}")
@@ -182,23 +364,20 @@ class SpotifyFetcher:
         artists = {}
         
         try:
-            artist_elements = self.driver.find_elements(By.CSS_SELECTOR, "[data-testid='artist-card']")
+            cards = self._extract_rows(
+                "[data-testid='artist-card']",
+                {"name": "[data-testid='artist-name']"},
+                "a[href*='/artist/']"
+            )
             
-            for i, element in enumerate(artist_elements):
-                try:
-                    name_elem = element.find_element(By.CSS_SELECTOR, "[data-testid='artist-name']")
-                    name = name_elem.text
-                    artist_id = f"artist_{i}"
-                    
-                    artists[artist_id] = {
-                        "name": name,
-                        "type": "artist",
-                        "id": artist_id
-                    }
-                    
-                except Exception as e:
-                    print(f"Error extracting artist {i}: {e}")
-                    continue
+            for i, card in enumerate(cards):
+                artist_id = f"artist_{i}"
+                artists[artist_id] = {
+                    "name": card["name"],
+                    "type": "artist",
+                    "id": artist_id,
+                    "uri": _uri_from_href(card["href"])
+                }
                     
         except Exception as e:
             print(f"Error fetching artists: {e}")
@@ -213,75 +392,92 @@ class SpotifyFetcher:
         albums = {}
         
         try:
-            album_elements = self.driver.find_elements(By.CSS_SELECTOR, "[data-testid='album-card']")
+            cards = self._extract_rows(
+                "[data-testid='album-card']",
+                {"name": "[data-testid='album-name']", "artist": "[data-testid='album-artist']"},
+                "a[href*='/album/']"
+            )
             
-            for i, element in enumerate(album_elements):
-                try:
-                    name_elem = element.find_element(By.CSS_SELECTOR, "[data-testid='album-name']")
-                    artist_elem = element.find_element(By.CSS_SELECTOR, "[data-testid='album-artist']")
-                    
-                    name = name_elem.text
-                    artist = artist_elem.text
-                    album_id = f"album_{i}"
-                    
-                    albums[album_id] = {
-                        "name": name,
-                        "artist": artist,
-                        "type": "album",
-                        "id": album_id
-                    }
-                    
-                except Exception as e:
-                    print(f"Error extracting album {i}: {e}")
-                    continue
+            for i, card in enumerate(cards):
+                album_id = f"album_{i}"
+                albums[album_id] = {
+                    "name": card["name"],
+                    "artist": card["artist"],
+                    "type": "album",
+                    "id": album_id,
+                    "uri": _uri_from_href(card["href"])
+                }
                     
         except Exception as e:
             print(f"Error fetching albums: {e}")
             
         return albums
         
-    def _scroll_to_load_all(self):
-        """Scroll to load all content"""
-        last_height = self.driver.execute_script("return document.body.scrollHeight")
-        
-        while True:
-            # Scroll down
-            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2)
-            
-            # Calculate new scroll height
-            new_height = self.driver.execute_script("return document.body.scrollHeight")
-            if new_height == last_height:
-                break
-            last_height = new_height
+    def search_track(self, title: str, artist: str, limit: int = 5) -> List[Dict]:
+        """Search for a track on Spotify, returns every candidate in result order"""
+        try:
+            return get_spotify_client().search_track(title, artist, limit)
+        except Exception as e:
+            if is_retryable(e) or isinstance(e, RuntimeError):
+                # Throttled, unreachable or logged out: not the same as "no results", let the caller decide
+                raise
+            print(f"Error searching for track '{title}' by '{artist}': {e}")
+            return []
             
     def create_playlist(self, playlist_data: Dict) -> str:
-        """Create a new playlist on Spotify"""
-        self._setup_driver_with_cookies()
+        """Create a new playlist on Spotify and add its tracks, returns "" on failure
+        
+        Always over HTTP, also with SPOTIFY_USE_BROWSER: the web player can't
+        add tracks, and an empty playlist reported as created loses the
+        conversion. Progress is checkpointed after every chunk like on YouTube
+        Music: calling create_playlist again with the same data resumes in the
+        same playlist from the first uncommitted chunk.
+        """
+        playlist_name = playlist_data.get("name", "Converted Playlist")
+        track_ids = [track["spotify_id"] for track in playlist_data.get("tracks", []) if track.get("spotify_id")]
+        checkpoints = get_write_checkpoints()
+        key = write_key("spotify", playlist_name, track_ids)
         
         try:
-            # Navigate to create playlist page
-            self.driver.get("https://open.spotify.com/playlist/create")
-            time.sleep(3)
-            
-            # Fill playlist name
-            name_input = WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "input[placeholder*='playlist']"))
+            checkpoint = checkpoints.get(key)
+            if checkpoint:
+                playlist_id, committed = checkpoint
+                print(f"Resuming playlist {playlist_id} after {committed} of {len(track_ids)} tracks")
+            else:
+                playlist_id = self.create_empty_playlist(playlist_name, playlist_data.get("description", ""))
+                committed = 0
+                checkpoints.save(key, playlist_id, committed)
+                
+            self.add_playlist_tracks(
+                playlist_id, track_ids[committed:],
+                on_chunk=lambda added: checkpoints.save(key, playlist_id, committed + added)
             )
-            name_input.clear()
-            name_input.send_keys(playlist_data["name"])
+            checkpoints.delete(key)
             
-            # Add tracks (simplified - would need more complex logic for actual track addition)
-            # This is a placeholder for the actual implementation
-            
-            # Get the playlist URL
-            playlist_url = self.driver.current_url
-            
-            return playlist_url
+            return f"https://open.spotify.com/playlist/{playlist_id}"
             
         except Exception as e:
             print(f"Error creating Spotify playlist: {e}")
+            if is_not_found(e):
+                # The checkpointed playlist was deleted: the next attempt starts a new one
+                checkpoints.delete(key)
             return ""
-        finally:
-            if self.driver:
-                self.driver.quit() 
\ No newline at end of file
+            
+    def create_empty_playlist(self, name: str, description: str = "") -> str:
+        """Create a playlist with no tracks over HTTP, returns its id (raises on failure)"""
+        return get_spotify_client().create_playlist(name, description)["id"]
+        
+    def add_playlist_tracks(self, playlist_id: str, track_ids: List[str],
+                            on_chunk: Optional[Callable[[int], None]] = None):
+        """Append tracks to an existing playlist (raises on failure)
+        
+        ``on_chunk(added)`` is called after each committed chunk with the
+        number of tracks added so far.
+        """
+        get_spotify_client().add_tracks(
+            playlist_id, [f"spotify:track:{track_id}" for track_id in track_ids], on_chunk=on_chunk
+        )
+        
+    def remove_playlist_tracks(self, playlist_id: str, track_ids: List[str]):
+        """Remove every occurrence of the given tracks from a playlist (raises on failure)"""
+        get_spotify_client().remove_tracks(playlist_id, [f"spotify:track:{track_id}" for track_id in track_ids])
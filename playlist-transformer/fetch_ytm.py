@@ -1,16 +1,31 @@
-from ytmusicapi import YTMusic
 import json
+import os
+import threading
 import time
-from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, Iterator, List, Optional
 from auth_browser import AuthManager
+from rate_limit import get_rate_limiter, is_not_found, is_retryable
+from checkpoints import get_write_checkpoints, write_key
+from metrics import STAGE_SECONDS
+from tracks import Track
 
 class YTMFetcher:
     def __init__(self):
         self.ytm = None
         self.auth_manager = AuthManager()
+        self._setup_lock = threading.Lock()
+        # Playlists whose tracks are fetched at once while loading the library
+        self.max_workers = int(os.environ.get("YTM_FETCH_WORKERS", 8))
+        # Tracks sent per add_playlist_items call when writing playlists
+        self.write_chunk_size = int(os.environ.get("YTM_WRITE_CHUNK_SIZE", 100))
         
     def _setup_ytm(self):
         """Setup YTMusic with authentication"""
+        # ytmusicapi is only imported once YouTube Music is used, it is slow to import
+        from ytmusicapi import YTMusic
+        
         try:
             # Try to load existing auth
             self.ytm = YTMusic()
@@ -26,10 +41,15 @@ class YTMFetcher:
             # Fallback to unauthenticated mode
             self.ytm = YTMusic()
             
+    def _ensure_ytm(self):
+        """Setup YTMusic once, safe to call from several threads"""
+        if self.ytm is None:
+            with self._setup_lock:
+                if self.ytm is None:
+                    self._setup_ytm()
+                    
     def get_library(self) -> Dict:
-        """Fetch user's YouTube Music library"""
-        self._setup_ytm()
-        
+        """Fetch user's YouTube Music library, all sections concurrently"""
         library = {
             "playlists": {},
             "liked_songs": {},
@@ -38,77 +58,152 @@ class YTMFetcher:
             "tracks": {}
         }
         
-        try:
-            # Fetch liked songs
-            library["liked_songs"] = self._fetch_liked_songs()
-            
-            # Fetch playlists
-            library["playlists"] = self._fetch_playlists()
-            
-            # Fetch saved albums
-            library["albums"] = self._fetch_saved_albums()
-            
-            # Fetch subscribed artists
-            library["artists"] = self._fetch_subscribed_artists()
-            
-        except Exception as e:
-            print(f"Error fetching YTM library: {e}")
+        timings: Dict[str, float] = {}
+        sections = self.library_sections(timings)
+        
+        with ThreadPoolExecutor(max_workers=len(sections), thread_name_prefix="ytm-section") as executor:
+            futures = {
+                name: executor.submit(fetch)
+                for name, fetch in sections.items()
+            }
+            for name, future in futures.items():
+                try:
+                    library[name] = future.result()
+                except Exception as e:
+                    print(f"Error fetching YTM {name}: {e}")
+                    
+        slowest = max(timings, key=timings.get, default=None)
+        if slowest:
+            print(f"YTM library fetched, slowest section: {slowest} ({timings[slowest]:.2f}s)")
             
         return library
         
+    def library_sections(self, timings: Optional[Dict[str, float]] = None) -> Dict[str, Callable[[], Dict]]:
+        """A timed fetch per library section, safe to run concurrently
+        
+        Lets callers show each section as soon as it arrives instead of
+        waiting for get_library. Each fetch records its seconds in
+        ``timings``, if given: the fetcher is shared, so it keeps none itself.
+        """
+        self._ensure_ytm()
+        
+        sections = {
+            "liked_songs": self._fetch_liked_songs,
+            "playlists": self._fetch_playlists,
+            "albums": self._fetch_saved_albums,
+            "artists": self._fetch_subscribed_artists
+        }
+        return {name: partial(self._timed_section, name, fetch, timings) for name, fetch in sections.items()}
+        
+    def _timed_section(self, name: str, fetch: Callable[[], Dict], timings: Optional[Dict[str, float]]) -> Dict:
+        """Run a section fetch and record how long it took"""
+        start = time.perf_counter()
+        try:
+            return fetch()
+        finally:
+            elapsed = time.perf_counter() - start
+            if timings is not None:
+                timings[name] = elapsed
+            STAGE_SECONDS.labels(f"library_ytm_{name}").observe(elapsed)
+        
     def _fetch_liked_songs(self) -> Dict:
         """Fetch user's liked songs"""
         liked_songs = {}
         
         try:
-            # Get liked songs
-            liked = self.ytm.get_liked_songs(limit=1000)
-            
-            for i, track in enumerate(liked['tracks']):
-                track_id = f"liked_{i}"
-                liked_songs[track_id] = {
-                    "title": track.get('title', ''),
-                    "artist": track.get('artists', [{}])[0].get('name', '') if track.get('artists') else '',
-                    "type": "liked_song",
-                    "id": track_id,
-                    "ytm_id": track.get('videoId', '')
-                }
-                
+            for page in self.iter_liked_songs():
+                for track in page:
+                    liked_songs[track["id"]] = track
+                    
         except Exception as e:
             print(f"Error fetching liked songs: {e}")
             
         return liked_songs
         
+    def iter_playlist_pages(self, playlist_id: str) -> Iterator[List[Dict]]:
+        """Yield the raw items of a playlist one page at a time, until the end
+        
+        Unlike YTMusic.get_playlist there is no item limit and nothing is
+        accumulated, so memory stays flat however long the playlist is.
+        Follows the continuation tokens the same way get_playlist does.
+        The library loader is the consumer: /match works on the tracks the
+        user selected from the loaded library, so it starts once the
+        sections it draws from have arrived, not on the first page.
+        """
+        from ytmusicapi.continuations import get_continuation_contents, get_continuation_params
+        from ytmusicapi.navigation import SECTION_LIST_ITEM, SINGLE_COLUMN_TAB, nav
+        from ytmusicapi.parsers.playlists import parse_playlist_items
+        
+        self._ensure_ytm()
+        browse_id = playlist_id if playlist_id.startswith("VL") else "VL" + playlist_id
+        body = {"browseId": browse_id}
+        
+        response = self.ytm._send_request("browse", body)
+        results = nav(response, SINGLE_COLUMN_TAB + SECTION_LIST_ITEM + ['musicPlaylistShelfRenderer'], True)
+        if not results:
+            return
+            
+        page = parse_playlist_items(results.get('contents', []))
+        if page:
+            yield page
+            
+        while 'continuations' in results:
+            response = self.ytm._send_request("browse", body, get_continuation_params(results))
+            if 'continuationContents' not in response:
+                break
+            results = response['continuationContents']['musicPlaylistShelfContinuation']
+            page = get_continuation_contents(results, parse_playlist_items)
+            if not page:
+                break
+            yield page
+            
+    def iter_liked_songs(self) -> Iterator[List[Track]]:
+        """Yield liked songs page by page, numbered liked_0, liked_1, ..."""
+        index = 0
+        for page in self.iter_playlist_pages("LM"):
+            tracks = []
+            for track in page:
+                tracks.append(Track(
+                    title=track.get('title', ''),
+                    artist=track.get('artists', [{}])[0].get('name', '') if track.get('artists') else '',
+                    duration_ms=track['duration_seconds'] * 1000 if track.get('duration_seconds') else None,
+                    type="liked_song",
+                    id=f"liked_{index}",
+                    ytm_id=track.get('videoId', '')
+                ))
+                index += 1
+            yield tracks
+            
+    def iter_playlist_tracks(self, playlist_id: str) -> Iterator[List[Track]]:
+        """Yield a playlist's tracks page by page"""
+        for page in self.iter_playlist_pages(playlist_id):
+            yield [
+                Track(
+                    title=track.get('title', ''),
+                    artist=track.get('artists', [{}])[0].get('name', '') if track.get('artists') else '',
+                    duration_ms=track['duration_seconds'] * 1000 if track.get('duration_seconds') else None,
+                    id=track.get('videoId', ''),
+                    ytm_id=track.get('videoId', '')
+                )
+                for track in page
+            ]
+            
     def _fetch_playlists(self) -> Dict:
-        """Fetch user's playlists"""
+        """Fetch user's playlists, loading their tracks on a bounded worker pool"""
         playlists = {}
         
         try:
-            # Get user playlists
-            user_playlists = self.ytm.get_library_playlists()
+            # Every playlist: ytmusicapi stops at 25 unless told otherwise
+            user_playlists = self.ytm.get_library_playlists(limit=None)
             
-            for i, playlist in enumerate(user_playlists):
-                playlist_id = f"playlist_{i}"
-                
-                # Get tracks for this playlist
-                try:
-                    playlist_tracks = self.ytm.get_playlist(playlist.get('playlistId', ''), limit=1000)
-                    tracks = []
-                    
-                    for track in playlist_tracks.get('tracks', []):
-                        tracks.append({
-                            "title": track.get('title', ''),
-                            "artist": track.get('artists', [{}])[0].get('name', '') if track.get('artists') else '',
-                            "id": track.get('videoId', ''),
-                            "ytm_id": track.get('videoId', '')
-                        })
-                        
-                except Exception as e:
-                    print(f"Error fetching tracks for playlist {playlist.get('name', '')}: {e}")
-                    tracks = []
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ytm-playlist") as executor:
+                # A failing playlist only loses its own tracks, see _fetch_playlist_tracks
+                all_tracks = list(executor.map(self._fetch_playlist_tracks, user_playlists))
                 
+            for i, (playlist, tracks) in enumerate(zip(user_playlists, all_tracks)):
+                playlist_id = f"playlist_{i}"
                 playlists[playlist_id] = {
-                    "name": playlist.get('name', ''),
+                    "name": playlist.get('title') or playlist.get('name', ''),
                     "type": "playlist",
                     "id": playlist_id,
                     "ytm_id": playlist.get('playlistId', ''),
@@ -120,13 +215,27 @@ class YTMFetcher:
             
         return playlists
         
+    def _fetch_playlist_tracks(self, playlist: Dict) -> List[Track]:
+        """Fetch the tracks of one playlist, returns [] if it fails"""
+        tracks = []
+        
+        try:
+            for page in self.iter_playlist_tracks(playlist.get('playlistId', '')):
+                tracks.extend(page)
+                
+        except Exception as e:
+            print(f"Error fetching tracks for playlist {playlist.get('name', '')}: {e}")
+            tracks = []
+            
+        return tracks
+        
     def _fetch_saved_albums(self) -> Dict:
         """Fetch saved albums"""
         albums = {}
         
         try:
             # Get saved albums
-            saved_albums = self.ytm.get_library_albums()
+            saved_albums = self.ytm.get_library_albums(limit=None)
             
             for i, album in enumerate(saved_albums):
                 album_id = f"album_{i}"
@@ -149,7 +258,7 @@ class YTMFetcher:
         
         try:
             # Get subscribed artists
-            subscribed_artists = self.ytm.get_library_subscriptions()
+            subscribed_artists = self.ytm.get_library_subscriptions(limit=None)
             
             for i, artist in enumerate(subscribed_artists):
                 artist_id = f"artist_{i}"
@@ -165,50 +274,120 @@ class YTMFetcher:
             
         return artists
         
-    def search_track(self, title: str, artist: str) -> Optional[Dict]:
-        """Search for a track on YouTube Music"""
+    def search_track(self, title: str, artist: str, limit: int = 5) -> List[Dict]:
+        """Search for a track on YouTube Music, returns every candidate in result order"""
+        candidates = []
+        
         try:
+            self._ensure_ytm()
             search_query = f"{title} {artist}"
-            results = self.ytm.search(search_query, filter="songs", limit=5)
+            results = get_rate_limiter("ytm_search").call(self.ytm.search, search_query, filter="songs", limit=limit)
             
-            if results:
-                # Return the first result
-                track = results[0]
-                return {
+            for track in results or []:
+                if not track.get('videoId'):
+                    continue
+                candidates.append({
                     "title": track.get('title', ''),
                     "artist": track.get('artists', [{}])[0].get('name', '') if track.get('artists') else '',
-                    "ytm_id": track.get('videoId', ''),
-                    "confidence": 0.8  # Placeholder confidence score
-                }
+                    "id": track.get('videoId', ''),
+                    "ytm_id": track.get('videoId', '')
+                })
                 
         except Exception as e:
+            if is_retryable(e):
+                # Still throttled after retries: not the same as "no results", let the caller decide
+                raise
             print(f"Error searching for track '{title}' by '{artist}': {e}")
             
-        return None
+        return candidates
         
     def create_playlist(self, playlist_data: Dict) -> str:
-        """Create a new playlist on YouTube Music"""
+        """Create a new playlist on YouTube Music, adding its tracks in chunks
+        
+        Progress is checkpointed after every chunk. If a write fails, calling
+        create_playlist again with the same data resumes in the same playlist
+        from the first uncommitted chunk instead of creating a second one,
+        unless the checkpoint expired (WRITE_CHECKPOINT_TTL) or the playlist
+        was deleted in the meantime.
+        """
+        playlist_name = playlist_data.get("name", "Converted Playlist")
+        track_ids = [track["ytm_id"] for track in playlist_data.get("tracks", []) if track.get("ytm_id")]
+        checkpoints = get_write_checkpoints()
+        key = write_key("ytm", playlist_name, track_ids)
+        
         try:
-            # Create playlist
-            playlist_name = playlist_data.get("name", "Converted Playlist")
-            playlist_id = self.ytm.create_playlist(playlist_name, "Playlist converted from another platform")
-            
-            # Add tracks to playlist
-            track_ids = []
-            for track in playlist_data.get("tracks", []):
-                if track.get("ytm_id"):
-                    track_ids.append(track["ytm_id"])
-                    
-            if track_ids:
-                self.ytm.add_playlist_items(playlist_id, track_ids)
+            checkpoint = checkpoints.get(key)
+            if checkpoint:
+                playlist_id, committed = checkpoint
+                print(f"Resuming playlist {playlist_id} after {committed} of {len(track_ids)} tracks")
+            else:
+                playlist_id = self.create_empty_playlist(playlist_name)
+                committed = 0
+                checkpoints.save(key, playlist_id, committed)
                 
+            self.add_playlist_tracks(
+                playlist_id, track_ids[committed:],
+                on_chunk=lambda added: checkpoints.save(key, playlist_id, committed + added)
+            )
+            checkpoints.delete(key)
+            
             # Return playlist URL
             return f"https://music.youtube.com/playlist?list={playlist_id}"
             
         except Exception as e:
             print(f"Error creating YTM playlist: {e}")
+            if is_not_found(e):
+                # The checkpointed playlist was deleted: the next attempt starts a new one
+                checkpoints.delete(key)
             return ""
             
+    def create_empty_playlist(self, name: str, description: str = "") -> str:
+        """Create a playlist with no tracks, returns its id (raises on failure)"""
+        self._ensure_ytm()
+        # Not idempotent: a retry after a timeout could create a second playlist
+        playlist_id = get_rate_limiter("ytm_write").call_write(
+            self.ytm.create_playlist, name, description or "Playlist converted from another platform"
+        )
+        if not isinstance(playlist_id, str):
+            raise Exception(f"Could not create playlist: {playlist_id}")
+        return playlist_id
+        
+    def add_playlist_tracks(self, playlist_id: str, video_ids: List[str], chunk_size: Optional[int] = None,
+                            on_chunk: Optional[Callable[[int], None]] = None):
+        """Append tracks to an existing playlist in order, keeping duplicates (raises on failure)
+        
+        Chunks of ``chunk_size`` (default YTM_WRITE_CHUNK_SIZE) are sent one
+        after another: the endpoint only appends, so sending them in parallel
+        would scramble the order. ``on_chunk(added)`` is called after each
+        committed chunk with the number of tracks added so far.
+        """
+        chunk_size = chunk_size or self.write_chunk_size
+        if video_ids:
+            self._ensure_ytm()
+        for start in range(0, len(video_ids), chunk_size):
+            chunk = video_ids[start:start + chunk_size]
+            # Not idempotent either (duplicates are kept), so only retried when rejected outright
+            result = get_rate_limiter("ytm_write").call_write(
+                self.ytm.add_playlist_items, playlist_id, chunk, duplicates=True
+            )
+            # Success is {"status": "STATUS_SUCCEEDED", ...}, failure the raw response
+            if not isinstance(result, dict) or "SUCCEEDED" not in str(result.get("status", "")):
+                raise Exception(f"Could not add tracks to playlist {playlist_id}: {result}")
+            if on_chunk:
+                on_chunk(start + len(chunk))
+                
+    def remove_playlist_tracks(self, playlist_id: str, video_ids: List[str]):
+        """Remove every occurrence of the given tracks from a playlist (raises on failure)"""
+        remove = set(video_ids)
+        # Removal needs each item's setVideoId, which only the playlist itself has
+        videos = [
+            item for page in self.iter_playlist_pages(playlist_id) for item in page
+            if item.get('videoId') in remove and item.get('setVideoId')
+        ]
+        if videos:
+            # Removing by setVideoId is idempotent, so any retryable error may be retried
+            get_rate_limiter("ytm_write").call(self.ytm.remove_playlist_items, playlist_id, videos)
+            
     def get_playlist_url(self, playlist_id: str) -> str:
         """Get URL for a playlist"""
         return f"https://music.youtube.com/playlist?list={playlist_id}"
@@ -0,0 +1,345 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from tracks import json_default
+
+def _pid_alive(pid: int) -> bool:
+    """True if a process with this id exists (the store is a local file, so workers share one host)"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class JobCancelled(Exception):
+    """Raised by MatchJob.record once the job was removed, to stop its matching early"""
+
+class SQLiteJobStore:
+    """Job progress and results in a SQLite file, so any worker process can serve
+    /match/progress and /match/stream for a job running in another one"""
+
+    def __init__(self, path: str = "sessions.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS match_jobs ("
+            "job_id TEXT PRIMARY KEY, session_id TEXT, total INTEGER, status TEXT, "
+            "error TEXT, completed INTEGER, finished_at REAL)"
+        )
+        # Added after the table was first created
+        for column in ("stats TEXT", "owner_pid INTEGER"):
+            try:
+                self._conn.execute(f"ALTER TABLE match_jobs ADD COLUMN {column}")
+            except sqlite3.OperationalError:
+                pass
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS match_job_results ("
+            "job_id TEXT, seq INTEGER, idx INTEGER, data TEXT, PRIMARY KEY (job_id, seq))"
+        )
+        self._conn.commit()
+        self.fail_orphans()
+
+    def fail_orphans(self) -> int:
+        """Mark jobs still "running" in a worker process that no longer exists as failed, returns how many"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id, owner_pid FROM match_jobs WHERE status = 'running'"
+            ).fetchall()
+            orphans = [job_id for job_id, pid in rows if not pid or not _pid_alive(pid)]
+            self._conn.executemany(
+                "UPDATE match_jobs SET status = 'failed', error = ?, finished_at = ? WHERE job_id = ?",
+                [("The worker running this job exited before it finished", time.time(), job_id)
+                 for job_id in orphans]
+            )
+            self._conn.commit()
+        return len(orphans)
+
+    def add(self, job: "MatchJob"):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO match_jobs "
+                "(job_id, session_id, total, status, error, completed, finished_at, owner_pid) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.job_id, job.session_id, job.total, job.status, job.error, 0, None, os.getpid())
+            )
+            self._conn.commit()
+
+    def append_results(self, job_id: str, start_seq: int, updates: List[tuple]):
+        """Store ``(index, match)`` pairs resolved from completion ``start_seq`` on"""
+        with self._lock:
+            if not self._conn.execute("SELECT 1 FROM match_jobs WHERE job_id = ?", (job_id,)).fetchone():
+                return  # Removed, possibly by another worker process
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO match_job_results VALUES (?, ?, ?, ?)",
+                [(job_id, start_seq + i, index, json.dumps(match, separators=(",", ":"), default=json_default))
+                 for i, (index, match) in enumerate(updates)]
+            )
+            self._conn.execute(
+                "UPDATE match_jobs SET completed = ? WHERE job_id = ?", (start_seq + len(updates), job_id)
+            )
+            self._conn.commit()
+
+    def set_stats(self, job_id: str, stats: Dict):
+        with self._lock:
+            self._conn.execute("UPDATE match_jobs SET stats = ? WHERE job_id = ?", (json.dumps(stats), job_id))
+            self._conn.commit()
+
+    def finish(self, job: "MatchJob"):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE match_jobs SET status = ?, error = ?, finished_at = ? WHERE job_id = ?",
+                (job.status, job.error, job.finished_at, job.job_id)
+            )
+            self._conn.commit()
+
+    def progress(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, completed, total, error, stats FROM match_jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            "job_id": job_id,
+            "status": row[0],
+            "completed": row[1],
+            "total": row[2],
+            "error": row[3],
+            "stats": json.loads(row[4]) if row[4] else {}
+        }
+
+    def updates_since(self, job_id: str, cursor: int) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT idx, data FROM match_job_results WHERE job_id = ? AND seq >= ? ORDER BY seq",
+                (job_id, cursor)
+            ).fetchall()
+        return [{"index": index, "match": json.loads(data)} for index, data in rows]
+
+    def remove(self, job_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM match_jobs WHERE job_id = ?", (job_id,))
+            self._conn.execute("DELETE FROM match_job_results WHERE job_id = ?", (job_id,))
+            self._conn.commit()
+
+    def prune(self, cutoff: float):
+        """Forget jobs finished before ``cutoff``"""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM match_job_results WHERE job_id IN "
+                "(SELECT job_id FROM match_jobs WHERE finished_at < ?)", (cutoff,)
+            )
+            self._conn.execute("DELETE FROM match_jobs WHERE finished_at < ?", (cutoff,))
+            self._conn.commit()
+
+class MatchJob:
+    """State of one background /match run, updated from worker threads
+
+    With a ``store``, resolved results are also written there in small
+    batches so other worker processes can follow the job.
+    """
+
+    FLUSH_EVERY = 50  # Results per store write
+    FLUSH_INTERVAL = 0.5  # Seconds before a partial batch is written anyway
+
+    def __init__(self, session_id: str, total: int, store: Optional[SQLiteJobStore] = None,
+                 job_id: Optional[str] = None):
+        self.job_id = job_id or uuid.uuid4().hex
+        self.session_id = session_id
+        self.total = total
+        self.status = "running"  # running, done or failed
+        self.error = ""
+        self.results: List[Optional[Dict]] = [None] * total
+        # Indices in the order they resolved, so streams can resume from a cursor
+        self.completed_order: List[int] = []
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.stats: Dict = {}  # e.g. dedup counts reported by the engine
+        self.cancelled = False
+        self.store = store
+        self._flushed = 0  # Completions already written to the store
+        self._last_flush = time.time()
+        self._lock = threading.Lock()
+        if store:
+            store.add(self)
+
+    def record(self, index: int, match: Dict):
+        """Store the result for the track at ``index``"""
+        with self._lock:
+            if self.cancelled:
+                raise JobCancelled(self.job_id)
+            self.results[index] = match
+            self.completed_order.append(index)
+            if self.store and (len(self.completed_order) - self._flushed >= self.FLUSH_EVERY
+                               or time.time() - self._last_flush >= self.FLUSH_INTERVAL):
+                self._flush_locked()
+
+    def cancel(self):
+        """Stop storing results; the running match stops at its next result"""
+        with self._lock:
+            self.cancelled = True
+            # Removed from the store already, writing would only leave orphaned rows
+            self.store = None
+
+    def set_stats(self, stats: Dict):
+        self.stats = dict(self.stats, **stats)
+        if self.store:
+            try:
+                self.store.set_stats(self.job_id, self.stats)
+            except sqlite3.Error as e:
+                print(f"Error saving stats of match job {self.job_id}: {e}")
+
+    def _flush_locked(self):
+        """Write unflushed results to the store, in completion order, caller holds the lock"""
+        pending = self.completed_order[self._flushed:]
+        self._last_flush = time.time()
+        if not pending:
+            return
+        try:
+            self.store.append_results(self.job_id, self._flushed, [(i, self.results[i]) for i in pending])
+            self._flushed += len(pending)
+        except sqlite3.Error as e:
+            print(f"Error saving progress of match job {self.job_id}: {e}")
+
+    def finish(self, results: Optional[List[Dict]] = None, error: str = ""):
+        with self._lock:
+            if results is not None:
+                self.results = results
+            self.status = "failed" if error else "done"
+            self.error = error
+            self.finished_at = time.time()
+            if self.store:
+                self._flush_locked()
+                try:
+                    self.store.finish(self)
+                except sqlite3.Error as e:
+                    print(f"Error saving status of match job {self.job_id}: {e}")
+
+    def updates_since(self, cursor: int) -> List[Dict]:
+        """Results resolved after the first ``cursor`` completions"""
+        with self._lock:
+            return [
+                {"index": index, "match": self.results[index]}
+                for index in self.completed_order[cursor:]
+            ]
+
+    def progress(self) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "completed": len(self.completed_order),
+            "total": self.total,
+            "error": self.error,
+            "stats": self.stats
+        }
+
+class RemoteMatchJob:
+    """Read-only view of a job running in another worker process"""
+
+    def __init__(self, store: SQLiteJobStore, job_id: str):
+        self.store = store
+        self.job_id = job_id
+
+    @property
+    def status(self) -> str:
+        return self.progress()["status"]
+
+    @property
+    def error(self) -> str:
+        return self.progress()["error"]
+
+    def updates_since(self, cursor: int) -> List[Dict]:
+        return self.store.updates_since(self.job_id, cursor)
+
+    def progress(self) -> Dict:
+        return self.store.progress(self.job_id) or {
+            "job_id": self.job_id, "status": "failed", "completed": 0, "total": 0,
+            "error": "Job was removed", "stats": {}
+        }
+
+class JobManager:
+    """Runs match jobs on a small pool of background threads
+
+    With a ``store`` shared between worker processes, get() also finds jobs
+    started by other workers and returns a RemoteMatchJob for them.
+    """
+
+    def __init__(self, max_jobs: int = int(os.environ.get("MATCH_JOB_WORKERS", 2)),
+                 retention: float = 3600, store: Optional[SQLiteJobStore] = None):
+        self.retention = retention  # Seconds a finished job stays readable
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix="match-job")
+        self._jobs: Dict[str, MatchJob] = {}
+        self._lock = threading.Lock()
+
+    def start(self, session_id: str, total: int,
+              run: Callable[[MatchJob], List[Dict]],
+              on_complete: Optional[Callable[[List[Dict]], None]] = None,
+              job_id: Optional[str] = None) -> MatchJob:
+        """Create a job and run ``run(job)`` in the background
+
+        ``run`` reports partial results through ``job.record`` and returns the
+        full ordered result list. ``on_complete(results)`` is called on success
+        before the job is marked done, so readers never see a finished job
+        whose results have not been stored yet. ``job_id`` lets the caller
+        record the id before the job can finish.
+        """
+        self._prune()
+        job = MatchJob(session_id, total, store=self.store, job_id=job_id)
+        with self._lock:
+            self._jobs[job.job_id] = job
+
+        def _worker():
+            try:
+                results = run(job)
+                if on_complete:
+                    on_complete(results)
+                job.finish(results=results)
+            except JobCancelled:
+                pass
+            except Exception as e:
+                print(f"Error in match job {job.job_id}: {e}")
+                job.finish(error=str(e))
+
+        self._executor.submit(_worker)
+        return job
+
+    def get(self, job_id: str) -> Optional[MatchJob]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self.store and self.store.progress(job_id):
+            return RemoteMatchJob(self.store, job_id)
+        return job
+
+    def remove(self, job_id: str):
+        """Forget a job, stopping it first if it is still running here"""
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+        if job is not None:
+            job.cancel()
+        if self.store:
+            self.store.remove(job_id)
+
+    def _prune(self):
+        """Forget finished jobs older than the retention period"""
+        cutoff = time.time() - self.retention
+        with self._lock:
+            for job_id in [j.job_id for j in self._jobs.values()
+                           if j.finished_at and j.finished_at < cutoff]:
+                del self._jobs[job_id]
+        if self.store:
+            self.store.prune(cutoff)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._jobs)
@@ -0,0 +1,151 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, Optional, Tuple
+
+DEFAULT_CACHE_PATH = os.environ.get("MATCH_CACHE_PATH", "match_cache.db")
+
+def normalize_text(text: str) -> str:
+    """Lowercase, strip accents/punctuation and collapse whitespace"""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[^\w]+", " ", text.lower())
+    return " ".join(text.split())
+
+def make_cache_key(title: str, artist: str, target_platform: str) -> str:
+    """Build the cache key for a track lookup on a target platform"""
+    return f"{target_platform}|{normalize_text(title)}|{normalize_text(artist)}"
+
+class MatchCache:
+    """SQLite-backed cache of search results shared by all MatchEngine instances
+
+    Entries expire after ``ttl`` seconds (``not_found_ttl`` for lookups that
+    found nothing) and the least recently used ones are evicted once the
+    cache holds more than ``max_entries`` rows.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = 100000,
+                 ttl: float = 30 * 24 * 3600, not_found_ttl: float = 24 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.not_found_ttl = not_found_ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS matches ("
+            "key TEXT PRIMARY KEY, result TEXT, expires_at REAL, last_used REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS matches_last_used ON matches (last_used)")
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COUNT(*) FROM matches").fetchone()[0]
+
+    def get(self, title: str, artist: str, target_platform: str) -> Tuple[bool, Optional[Dict]]:
+        """Look up a cached result, returns (hit, result) where result is None for not_found"""
+        key = make_cache_key(title, artist, target_platform)
+        now = time.time()
+
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT result, expires_at FROM matches WHERE key = ?", (key,)
+                ).fetchone()
+
+                if row and row[1] < now:
+                    self._conn.execute("DELETE FROM matches WHERE key = ?", (key,))
+                    self._conn.commit()
+                    self._size -= 1
+                    row = None
+
+                if not row:
+                    self.misses += 1
+                    return False, None
+
+                self._conn.execute("UPDATE matches SET last_used = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+                self.hits += 1
+                return True, json.loads(row[0])
+
+            except sqlite3.Error as e:
+                print(f"Error reading match cache: {e}")
+                self.misses += 1
+                return False, None
+
+    def set(self, title: str, artist: str, target_platform: str, result: Optional[Dict]):
+        """Store a search result (None records a not_found lookup)"""
+        key = make_cache_key(title, artist, target_platform)
+        now = time.time()
+        expires_at = now + (self.ttl if result else self.not_found_ttl)
+
+        with self._lock:
+            try:
+                existed = self._conn.execute(
+                    "SELECT 1 FROM matches WHERE key = ?", (key,)
+                ).fetchone()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO matches (key, result, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(result), expires_at, now)
+                )
+                if not existed:
+                    self._size += 1
+                if self._size > self.max_entries:
+                    self._evict(now)
+                self._conn.commit()
+
+            except sqlite3.Error as e:
+                print(f"Error writing match cache: {e}")
+
+    def _evict(self, now: float):
+        """Drop expired rows, then least recently used rows down to 90% of max_entries"""
+        removed = self._conn.execute("DELETE FROM matches WHERE expires_at < ?", (now,)).rowcount
+        self._size -= removed
+
+        excess = self._size - int(self.max_entries * 0.9)
+        if excess > 0:
+            removed += self._conn.execute(
+                "DELETE FROM matches WHERE key IN "
+                "(SELECT key FROM matches ORDER BY last_used LIMIT ?)", (excess,)
+            ).rowcount
+            self._size = self._conn.execute("SELECT COUNT(*) FROM matches").fetchone()[0]
+
+        self.evictions += removed
+
+    def clear(self):
+        """Remove every cached entry"""
+        with self._lock:
+            self._conn.execute("DELETE FROM matches")
+            self._conn.commit()
+            self._size = 0
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size, for sizing the cache"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": self._size,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions
+        }
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_match_cache() -> MatchCache:
+    """Return the process-wide match cache, opening it on first use"""
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = MatchCache()
+    return _default_cache
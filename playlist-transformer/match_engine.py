@@ -1,121 +1,331 @@
-from thefuzz import fuzz
-from typing import Dict, List, Optional
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
 from fetch_spotify import SpotifyFetcher
 from fetch_ytm import YTMFetcher
+from match_cache import MatchCache, get_match_cache, make_cache_key
+from catalog_index import CatalogIndex, get_catalog
+from confirmed_matches import TIERS, ConfirmedMatches, get_confirmed_matches
+from metrics import MATCH_TIER_TRACKS, STAGE_SECONDS
+from scoring import ParallelScorer, get_scorer, score_group
+from tracks import MatchEntry
 
-class MatchEngine:
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution
+    
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait for and share its result (or exception).
+    """
+    
     def __init__(self):
-        self.spotify_fetcher = SpotifyFetcher()
-        self.ytm_fetcher = YTMFetcher()
+        self._calls: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+        
+    def do(self, key: str, fn: Callable[[], object]):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {"done": threading.Event(), "result": None, "error": None}
+            else:
+                self.coalesced += 1
+                
+        if not leader:
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+            
+        try:
+            call["result"] = fn()
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["done"].set()
+        return call["result"]
+
+# Shared by every engine, so concurrent jobs searching the same track search it once
+_lookups = SingleFlight()
+
+# Histogram children looked up once, keeping the per-track cost to one observe()
+_SEARCH_SECONDS = {
+    "spotify": STAGE_SECONDS.labels("search_spotify"),
+    "ytm": STAGE_SECONDS.labels("search_ytm")
+}
+_SCORING_SECONDS = STAGE_SECONDS.labels("scoring")
+_TIER_TRACKS = {tier: MATCH_TIER_TRACKS.labels(tier) for tier in TIERS + ("fuzzy",)}
+
+# Unique tracks searched and scored together when matching against a local catalog
+CATALOG_BATCH_SIZE = 2048
+
+class MatchEngine:
+    def __init__(self, max_workers: Optional[int] = None, cache: Optional[MatchCache] = None,
+                 catalog: Optional[CatalogIndex] = None, scorer: Optional[ParallelScorer] = None,
+                 confirmed: Optional[ConfirmedMatches] = None, spotify_fetcher: Optional[SpotifyFetcher] = None,
+                 ytm_fetcher: Optional[YTMFetcher] = None):
+        self.spotify_fetcher = spotify_fetcher or SpotifyFetcher()
+        self.ytm_fetcher = ytm_fetcher or YTMFetcher()
         self.confidence_threshold = 70
+        # Runners-up kept with each match so corrections can pick one without searching
+        self.max_alternatives = 4
+        # Number of searches allowed in flight at once (1 = sequential)
+        self.max_workers = max_workers or int(os.environ.get("MATCH_CONCURRENCY", 8))
+        # Search results are shared across engines through the persistent cache
+        self.cache = cache if cache is not None else get_match_cache()
+        # Local catalog queried instead of the network, see catalog_index.py
+        self.catalog = catalog
+        # Spreads large scoring batches over worker processes, see scoring.py
+        self.scorer = scorer if scorer is not None else get_scorer()
+        # Matches users confirmed before, looked up by exact key ahead of any search
+        self.confirmed = confirmed if confirmed is not None else get_confirmed_matches()
         
-    def match_tracks(self, tracks: List[Dict], source_platform: str, target_platform: str) -> List[Dict]:
-        """Match tracks from source platform to target platform"""
-        matched_tracks = []
-        
-        for track in tracks:
-            match_result = self._match_single_track(track, target_platform)
-            if match_result:
-                matched_tracks.append({
-                    "original_id": track.get("id", ""),
-                    "original_title": track.get("title", ""),
-                    "original_artist": track.get("artist", ""),
-                    "matched_title": match_result.get("title", ""),
-                    "matched_artist": match_result.get("artist", ""),
-                    "matched_id": match_result.get("id", ""),
-                    "confidence": match_result.get("confidence", 0),
-                    "status": "matched" if match_result.get("confidence", 0) >= self.confidence_threshold else "low_confidence"
-                })
+    def match_tracks(self, tracks: List[Dict], source_platform: str, target_platform: str,
+                     max_workers: Optional[int] = None,
+                     on_result: Optional[Callable[[int, Dict], None]] = None,
+                     on_dedup: Optional[Callable[[Dict], None]] = None) -> List[Dict]:
+        """Match tracks from source platform to target platform
+        
+        Tracks with the same normalized title and artist (e.g. a song that is
+        both liked and in several playlists) are searched once and the result
+        fans out to every occurrence. Each unique track is first looked up by
+        ISRC, then by title/artist/duration, in the index of confirmed
+        matches; only misses are searched. Searches run on a bounded thread
+        pool of ``max_workers`` threads (defaults to ``self.max_workers``);
+        against a local catalog, tracks are scored in batches on the scorer's
+        worker processes instead. Results keep the order of ``tracks``;
+        ``on_result(index, entry)`` is called as each track resolves.
+        ``on_dedup(stats)`` receives the dedup counts and the unique tracks
+        resolved per tier before searching starts.
+        """
+        # Normalized lookup key -> indices of every track sharing it
+        groups: Dict[str, List[int]] = {}
+        for index, track in enumerate(tracks):
+            key = make_cache_key(track.get("title", ""), track.get("artist", ""), target_platform)
+            groups.setdefault(key, []).append(index)
+            
+        # Exact-key tiers first; what they resolve skips search and scoring
+        exact = self.confirmed.lookup_many([tracks[indices[0]] for indices in groups.values()], target_platform)
+        tiers = {tier: 0 for tier in _TIER_TRACKS}
+        resolved, pending = [], []
+        for indices, (tier, match_result) in zip(groups.values(), exact):
+            if tier:
+                resolved.append((indices, dict(match_result, confidence=100.0, alternatives=[])))
             else:
-                matched_tracks.append({
-                    "original_id": track.get("id", ""),
-                    "original_title": track.get("title", ""),
-                    "original_artist": track.get("artist", ""),
-                    "matched_title": "",
-                    "matched_artist": "",
-                    "matched_id": "",
-                    "confidence": 0,
-                    "status": "not_found"
-                })
+                pending.append(indices)
+            tiers[tier or "fuzzy"] += 1
+        for tier, count in tiers.items():
+            _TIER_TRACKS[tier].inc(count)
+            
+        if on_dedup:
+            on_dedup(dict(self.dedup_stats(len(tracks), len(groups)), tiers=tiers))
+            
+        workers = min(max_workers or self.max_workers, len(pending))
+        matched_tracks: List[Optional[Dict]] = [None] * len(tracks)
+        
+        def _resolve(indices: List[int], match_result: Optional[Dict]):
+            for index in indices:
+                matched_tracks[index] = self._build_match_entry(tracks[index], match_result)
+                if on_result:
+                    on_result(index, matched_tracks[index])
+        
+        for indices, match_result in resolved:
+            _resolve(indices, match_result)
+            
+        catalog = self._catalog_for(target_platform)
+        if catalog is not None and pending:
+            self._match_catalog(catalog, tracks, pending, workers, _resolve)
+        elif workers <= 1:
+            for indices in pending:
+                _resolve(indices, self._match_single_track(tracks[indices[0]], target_platform))
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(self._match_single_track, tracks[indices[0]], target_platform): indices
+                    for indices in pending
+                }
+                for future in as_completed(futures):
+                    _resolve(futures[future], future.result())
                 
         return matched_tracks
         
+    def _match_catalog(self, catalog: CatalogIndex, tracks: List[Dict], groups: List[List[int]], workers: int,
+                       resolve: Callable[[List[int], Optional[Dict]], None]):
+        """Match track groups against a local catalog, scoring each batch in one call"""
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            for start in range(0, len(groups), CATALOG_BATCH_SIZE):
+                batch = groups[start:start + CATALOG_BATCH_SIZE]
+                queries = [(tracks[indices[0]].get("title", ""), tracks[indices[0]].get("artist", "")) for indices in batch]
+                row_lists = list(executor.map(lambda query: catalog.search_rows(*query), queries))
+                for indices, scored in zip(batch, self.score_catalog_batch(catalog, queries, row_lists)):
+                    resolve(indices, self._pick_best(scored) if scored else None)
+        
+    @staticmethod
+    def dedup_stats(total: int, unique: int) -> Dict:
+        """How many of ``total`` tracks were duplicates, as counts and a ratio"""
+        return {
+            "tracks": total,
+            "unique_tracks": unique,
+            "dedup_ratio": round(1 - unique / total, 3) if total else 0.0
+        }
+        
+    def _build_match_entry(self, track: Dict, match_result: Optional[Dict]) -> MatchEntry:
+        """Build the result entry for a single source track"""
+        if match_result:
+            return MatchEntry(
+                original_id=track.get("id", ""),
+                original_title=track.get("title", ""),
+                original_artist=track.get("artist", ""),
+                matched_title=match_result.get("title", ""),
+                matched_artist=match_result.get("artist", ""),
+                matched_id=match_result.get("id", ""),
+                confidence=match_result.get("confidence", 0),
+                status="matched" if match_result.get("confidence", 0) >= self.confidence_threshold else "low_confidence",
+                # Copied: duplicates of a track share one search result
+                alternatives=list(match_result.get("alternatives", []))
+            )
+            
+        return MatchEntry(
+            original_id=track.get("id", ""),
+            original_title=track.get("title", ""),
+            original_artist=track.get("artist", "")
+        )
+        
     def _match_single_track(self, track: Dict, target_platform: str) -> Optional[Dict]:
         """Match a single track to the target platform"""
-        title = track.get("title", "")
-        artist = track.get("artist", "")
+        return self._lookup(track.get("title", ""), track.get("artist", ""), target_platform)
         
-        if target_platform == "spotify":
-            return self._search_spotify(title, artist)
-        else:  # ytm
-            return self._search_ytm(title, artist)
+    def _lookup(self, title: str, artist: str, target_platform: str) -> Optional[Dict]:
+        """Search the target platform, going through the match cache first"""
+        catalog = self._catalog_for(target_platform)
+        if catalog is not None:
+            return self._search_catalog(catalog, title, artist)
             
-    def _search_spotify(self, title: str, artist: str) -> Optional[Dict]:
-        """Search for track on Spotify"""
-        # This would use Spotify's search API
-        # For now, return a placeholder with fuzzy matching
-        search_query = f"{title} {artist}"
-        
-        # Simulate search results with fuzzy matching
-        potential_matches = [
-            {"title": title, "artist": artist, "id": f"spotify_{title}_{artist}"},
-            {"title": title + " (Remix)", "artist": artist, "id": f"spotify_{title}_remix"},
-            {"title": title, "artist": artist + " feat. Someone", "id": f"spotify_{title}_feat"}
-        ]
-        
-        best_match = None
-        best_score = 0
+        # Identical lookups already in flight (other jobs, other pages) wait and share the result
+        return _lookups.do(
+            make_cache_key(title, artist, target_platform),
+            lambda: self._cached_search(title, artist, target_platform)
+        )
         
-        for match in potential_matches:
-            title_score = fuzz.ratio(title.lower(), match["title"].lower())
-            artist_score = fuzz.ratio(artist.lower(), match["artist"].lower())
-            combined_score = (title_score + artist_score) / 2
+    def _cached_search(self, title: str, artist: str, target_platform: str) -> Optional[Dict]:
+        """Search the target platform through the match cache"""
+        hit, result = self.cache.get(title, artist, target_platform)
+        if hit:
+            return result
             
-            if combined_score > best_score:
-                best_score = combined_score
-                best_match = match
-                
-        if best_match and best_score >= self.confidence_threshold:
-            return {
-                "title": best_match["title"],
-                "artist": best_match["artist"],
-                "id": best_match["id"],
-                "confidence": best_score
-            }
+        start = time.perf_counter()
+        try:
+            if target_platform == "spotify":
+                result = self._search_spotify(title, artist)
+            else:  # ytm
+                result = self._search_ytm(title, artist)
+        except Exception as e:
+            # Throttled or unreachable: report not found this time, but don't cache it
+            print(f"Error searching {target_platform} for '{title}' by '{artist}': {e}")
+            return None
+        finally:
+            _SEARCH_SECONDS.get(target_platform, _SEARCH_SECONDS["ytm"]).observe(time.perf_counter() - start)
+            
+        self.cache.set(title, artist, target_platform, result)
+        return result
+            
+    def _score_candidates(self, title: str, artist: str, candidates: List[Dict]) -> List[Dict]:
+        """Score all candidates against the query in one batched pass, best first"""
+        if not candidates:
+            return []
             
+        start = time.perf_counter()
+        confidences = score_group(
+            title, artist, [c.get("title", "") for c in candidates], [c.get("artist", "") for c in candidates]
+        )
+        scored = self._rank(candidates, confidences)
+        _SCORING_SECONDS.observe(time.perf_counter() - start)
+        return scored
+        
+    def score_catalog_batch(self, catalog: CatalogIndex, queries: List[Tuple[str, str]],
+                            row_lists: List[np.ndarray]) -> List[List[Dict]]:
+        """Score many (title, artist) queries against their own catalog rows, each list best first
+        
+        Large batches are spread over the scorer's worker processes. Only the
+        best match and its alternatives are decoded from the catalog.
+        """
+        start = time.perf_counter()
+        keep = 1 + self.max_alternatives
+        results = []
+        for rows, confidences in zip(row_lists, self.scorer.score_rows(catalog, queries, row_lists)):
+            # Same order _rank produces: rounded confidence, ties keep the catalog's ranking
+            top = np.argsort(-np.round(confidences, 1), kind="stable")[:keep]
+            results.append(self._rank([catalog.get_row(int(rows[i])) for i in top], confidences[top]))
+        _SCORING_SECONDS.observe(time.perf_counter() - start)
+        return results
+        
+    def _rank(self, candidates: List[Dict], confidences) -> List[Dict]:
+        """Attach confidences to candidates, best first"""
+        scored = [
+            {
+                "title": candidate.get("title", ""),
+                "artist": candidate.get("artist", ""),
+                "id": candidate.get("id", ""),
+                "confidence": round(float(confidence), 1)
+            }
+            for candidate, confidence in zip(candidates, confidences)
+        ]
+        
+        # Stable sort keeps the platform's own ranking between equal scores
+        scored.sort(key=lambda c: c["confidence"], reverse=True)
+        return scored
+        
+    def _pick_best(self, scored: List[Dict]) -> Dict:
+        """Return the best scored candidate with the runners-up attached"""
+        best = dict(scored[0])
+        best["alternatives"] = scored[1:1 + self.max_alternatives]
+        return best
+        
+    def _catalog_for(self, target_platform: str) -> Optional[CatalogIndex]:
+        """Local catalog for the target platform, if one is configured"""
+        if self.catalog is not None:
+            return self.catalog if self.catalog.platform == target_platform else None
+        return get_catalog(target_platform)
+        
+    def _search_catalog(self, catalog: CatalogIndex, title: str, artist: str) -> Optional[Dict]:
+        """Search the local catalog index"""
+        scored = self.score_catalog_batch(catalog, [(title, artist)], [catalog.search_rows(title, artist)])[0]
+        if scored:
+            return self._pick_best(scored)
+        return None
+        
+    def _search_spotify(self, title: str, artist: str) -> Optional[Dict]:
+        """Search for track on Spotify, search errors propagate to _lookup"""
+        candidates = self.spotify_fetcher.search_track(title, artist)
+        scored = self._score_candidates(title, artist, candidates)
+        if scored:
+            return self._pick_best(scored)
         return None
         
     def _search_ytm(self, title: str, artist: str) -> Optional[Dict]:
-        """Search for track on YouTube Music"""
-        try:
-            result = self.ytm_fetcher.search_track(title, artist)
-            if result:
-                # Calculate confidence using fuzzy matching
-                title_score = fuzz.ratio(title.lower(), result["title"].lower())
-                artist_score = fuzz.ratio(artist.lower(), result["artist"].lower())
-                combined_score = (title_score + artist_score) / 2
-                
-                result["confidence"] = combined_score
-                return result
-        except Exception as e:
-            print(f"Error searching YTM: {e}")
-            
+        """Search for track on YouTube Music, search errors propagate to _lookup"""
+        candidates = self.ytm_fetcher.search_track(title, artist)
+        scored = self._score_candidates(title, artist, candidates)
+        if scored:
+            return self._pick_best(scored)
         return None
         
-    def rematch_track(self, title: str, artist: str, target_platform: str) -> Dict:
-        """Re-match a track with corrected information"""
-        if target_platform == "spotify":
-            result = self._search_spotify(title, artist)
-        else:
-            result = self._search_ytm(title, artist)
-            
+    def _to_correction(self, result: Optional[Dict]) -> Dict:
+        """Build the fields of a match entry that a correction replaces"""
         if result:
             return {
                 "matched_title": result["title"],
                 "matched_artist": result["artist"],
                 "matched_id": result["id"],
                 "confidence": result["confidence"],
-                "status": "matched" if result["confidence"] >= self.confidence_threshold else "low_confidence"
+                "status": "matched" if result["confidence"] >= self.confidence_threshold else "low_confidence",
+                "alternatives": result.get("alternatives", [])
             }
         else:
             return {
@@ -123,9 +333,37 @@ class MatchEngine:
                 "matched_artist": "",
                 "matched_id": "",
                 "confidence": 0,
-                "status": "not_found"
+                "status": "not_found",
+                "alternatives": []
             }
             
+    def rematch_track(self, title: str, artist: str, target_platform: str) -> Dict:
+        """Re-match a track with corrected information"""
+        return self._to_correction(self._lookup(title, artist, target_platform))
+        
+    def select_alternative(self, match: Dict, alternative_id: str) -> Optional[Dict]:
+        """Swap a match to one of its stored alternatives, no new search needed"""
+        alternatives = match.get("alternatives", [])
+        chosen = next((alt for alt in alternatives if alt["id"] == alternative_id), None)
+        if not chosen:
+            return None
+            
+        # The previous pick becomes a runner-up so the user can switch back
+        remaining = [alt for alt in alternatives if alt["id"] != alternative_id]
+        if match.get("matched_id"):
+            remaining.insert(0, {
+                "title": match.get("matched_title", ""),
+                "artist": match.get("matched_artist", ""),
+                "id": match["matched_id"],
+                "confidence": match.get("confidence", 0)
+            })
+            
+        correction = self._to_correction(chosen)
+        # A manual pick is what the user wants regardless of fuzzy score
+        correction["status"] = "matched"
+        correction["alternatives"] = remaining
+        return correction
+            
     def batch_match(self, tracks: List[Dict], target_platform: str) -> List[Dict]:
         """Batch match multiple tracks for efficiency"""
         # This could implement batch searching if the APIs support it
@@ -0,0 +1,191 @@
+import bisect
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple, Union
+
+# Seconds; spans a cached lookup (sub-millisecond) up to a full library fetch
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str):
+        """Child for one label combination; keep the result to skip the lookup on hot paths"""
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(child.render(self.name, _format_labels(self.labelnames, values)))
+        return lines
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def render(self, name: str, labels: str) -> List[str]:
+        return [f"{name}{labels} {_format_value(self.value)}"]
+
+class Counter(_Metric):
+    """Monotonic count, e.g. requests served"""
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def render(self, name: str, labels: str) -> List[str]:
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        lines = []
+        cumulative = 0
+        inner = labels[1:-1]
+        for bound, count in zip(list(self.buckets) + [float("inf")], counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else _format_value(bound)
+            bucket_labels = "{" + (inner + "," if inner else "") + f'le="{le}"' + "}"
+            lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+        lines.append(f"{name}_sum{labels} {repr(total)}")
+        lines.append(f"{name}_count{labels} {cumulative}")
+        return lines
+
+class Histogram(_Metric):
+    """Distribution of observed values (durations in seconds) over fixed buckets"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+class CallbackMetric:
+    """Value read at scrape time from ``fn``, which returns a number or {label values: number}
+
+    For numbers other components already track (cache hits, live drivers,
+    session count), so nothing is added to their hot paths.
+    """
+
+    def __init__(self, name: str, help_text: str, fn: Callable[[], Union[float, Dict[Tuple[str, ...], float]]],
+                 labelnames: Tuple[str, ...] = (), kind: str = "gauge"):
+        self.name = name
+        self.help_text = help_text
+        self.fn = fn
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+
+    def render(self) -> List[str]:
+        try:
+            value = self.fn()
+        except Exception as e:
+            print(f"Error collecting metric {self.name}: {e}")
+            return []
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        samples = value.items() if isinstance(value, dict) else [((), value)]
+        for values, number in samples:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(number)}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Add a metric, returning the one already registered under its name if any"""
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+# Per-stage latency: auth_start, auth_complete, library_<platform>_<section>,
+# search_<platform>, scoring, playlist_create_<platform>
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "playlist_stage_duration_seconds", "Duration of each pipeline stage", ("stage",)
+))
+
+# Unique tracks per matching tier: isrc and key (confirmed match index), fuzzy (search and scoring)
+MATCH_TIER_TRACKS = REGISTRY.register(Counter(
+    "playlist_match_tier_tracks_total", "Unique tracks resolved by each matching tier", ("tier",)
+))
+
+def process_memory_bytes() -> float:
+    """Resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+        # Without /proc, fall back to the peak RSS (reported in bytes on macOS, kilobytes elsewhere)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
@@ -0,0 +1,185 @@
+import os
+import random
+import re
+import threading
+import time
+from typing import Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+# ytmusicapi raises a plain Exception("Server returned HTTP <code>: ...")
+_HTTP_STATUS = re.compile(r"HTTP (\d{3})")
+
+def _status_code(error: Exception) -> Optional[int]:
+    """HTTP status behind a requests or ytmusicapi error, if any"""
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is None:
+        found = _HTTP_STATUS.search(str(error))
+        status = int(found.group(1)) if found else None
+    return status
+
+def is_throttle(error: Exception) -> bool:
+    """True for errors meaning "slow down": HTTP 429 and 503"""
+    return _status_code(error) in (429, 503)
+
+def is_not_found(error: Exception) -> bool:
+    """True for HTTP 404, e.g. a write to a playlist that was deleted"""
+    return _status_code(error) == 404
+
+def is_retryable(error: Exception) -> bool:
+    """Throttles, other 5xx responses and dropped connections are worth retrying"""
+    # Imported here, not at module load: whoever raised the error has loaded it already
+    import requests
+
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    status = _status_code(error)
+    return status is not None and (status == 429 or status >= 500)
+
+def is_rejected(error: Exception) -> bool:
+    """True for errors that guarantee the request was never processed: HTTP 429 and connect timeouts
+
+    The only errors after which a non-idempotent write is safe to repeat; a
+    5xx or read timeout may come after the server already applied it.
+    """
+    import requests
+
+    return isinstance(error, requests.ConnectTimeout) or _status_code(error) == 429
+
+class AdaptiveRateLimiter:
+    """Token bucket whose rate adapts to the server (AIMD)
+
+    Every call takes one token; tokens refill at ``rate`` per second up to
+    ``burst``. Each success raises the rate by ``increase`` (additive, up to
+    ``max_rate``) and each throttle multiplies it by ``decrease`` (down to
+    ``min_rate``), so throughput settles just under what the server accepts.
+    call() also retries retryable errors with exponential backoff and full
+    jitter; call_write() retries only errors that prove the request was
+    rejected unprocessed, for writes that must not be applied twice.
+    """
+
+    def __init__(self, rate: float = 5.0, burst: float = 5.0, min_rate: float = 0.5,
+                 max_rate: float = 50.0, increase: float = 0.1, decrease: float = 0.5,
+                 max_retries: int = 5, base_delay: float = 0.5, max_delay: float = 30.0,
+                 name: str = "limiter"):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.name = name
+
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.throttles = 0
+        self.retries = 0
+        self.failures = 0
+        self.wait_time = 0.0
+
+    def acquire(self) -> float:
+        """Block until a token is available, returns the seconds waited"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self.requests += 1
+                    self.wait_time += waited
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self):
+        with self._lock:
+            self.throttles += 1
+            now = time.monotonic()
+            # Concurrent callers see the same throttle; back off once per round trip
+            if now - self._last_decrease >= 1 / self.rate:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self._last_decrease = now
+            self._tokens = min(self._tokens, 0)
+
+    def call(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Rate-limited ``fn(*args, **kwargs)``, retried while the error is retryable"""
+        return self._call(is_retryable, fn, args, kwargs)
+
+    def call_write(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Rate-limited non-idempotent ``fn(*args, **kwargs)``, retried only while it is rejected unprocessed"""
+        return self._call(is_rejected, fn, args, kwargs)
+
+    def _call(self, retry_if: Callable[[Exception], bool], fn: Callable[..., T], args, kwargs) -> T:
+        attempt = 0
+        while True:
+            self.acquire()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if is_throttle(e):
+                    self.on_throttle()
+                if attempt >= self.max_retries or not retry_if(e):
+                    with self._lock:
+                        self.failures += 1
+                    raise
+
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                attempt += 1
+                with self._lock:
+                    self.retries += 1
+                    self.wait_time += delay
+                time.sleep(delay)
+                continue
+
+            self.on_success()
+            return result
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "rate": round(self.rate, 2),
+                "requests": self.requests,
+                "throttles": self.throttles,
+                "retries": self.retries,
+                "failures": self.failures,
+                "wait_time": round(self.wait_time, 2)
+            }
+
+_limiters: Dict[str, AdaptiveRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(name: str) -> AdaptiveRateLimiter:
+    """Process-wide limiter per endpoint group, e.g. "ytm_search" or "ytm_write"
+
+    Starting rates come from <NAME>_RATE (requests per second) and
+    <NAME>_MAX_RATE, e.g. YTM_SEARCH_RATE=5.
+    """
+    with _limiters_lock:
+        if name not in _limiters:
+            prefix = name.upper()
+            rate = float(os.environ.get(f"{prefix}_RATE", 5))
+            _limiters[name] = AdaptiveRateLimiter(
+                rate=rate,
+                burst=max(rate, 1),
+                max_rate=float(os.environ.get(f"{prefix}_MAX_RATE", 50)),
+                name=name
+            )
+        return _limiters[name]
+
+def rate_limiter_stats() -> Dict[str, Dict]:
+    with _limiters_lock:
+        return {name: limiter.stats() for name, limiter in _limiters.items()}
@@ -0,0 +1,67 @@
+import threading
+from typing import TYPE_CHECKING, Callable, Dict, TypeVar
+
+if TYPE_CHECKING:
+    from fetch_spotify import SpotifyFetcher
+    from fetch_ytm import YTMFetcher
+    from match_engine import MatchEngine
+    from resync import PlaylistSync
+
+T = TypeVar("T")
+
+# Application-lifetime instances, by name
+_instances: Dict[str, object] = {}
+# Reentrant: building the engine builds the fetchers it is made of
+_lock = threading.RLock()
+
+def shared(name: str, factory: Callable[[], T]) -> T:
+    """Return the instance registered under ``name``, building it with ``factory`` on first use"""
+    instance = _instances.get(name)
+    if instance is None:
+        with _lock:
+            instance = _instances.get(name)
+            if instance is None:
+                instance = _instances[name] = factory()
+    return instance
+
+# The modules below are imported by the getters, not up front: they pull in
+# Selenium, ytmusicapi, requests, numpy and rapidfuzz, which only the requests
+# that use them should pay for.
+
+def get_spotify_fetcher() -> "SpotifyFetcher":
+    """Shared SpotifyFetcher; its browser fallbacks check out their own driver, so it is safe across threads"""
+    def build():
+        from fetch_spotify import SpotifyFetcher
+        return SpotifyFetcher()
+    return shared("spotify_fetcher", build)
+
+def get_ytm_fetcher() -> "YTMFetcher":
+    """Shared YTMFetcher, sets up YTMusic once and rate limits every caller together"""
+    def build():
+        from fetch_ytm import YTMFetcher
+        return YTMFetcher()
+    return shared("ytm_fetcher", build)
+
+def get_fetcher(platform: str):
+    """Shared fetcher of a platform ("spotify" or "ytm")"""
+    return get_spotify_fetcher() if platform == "spotify" else get_ytm_fetcher()
+
+def get_match_engine() -> "MatchEngine":
+    """Shared MatchEngine built on the shared fetchers; match_tracks keeps no state between calls"""
+    def build():
+        from match_engine import MatchEngine
+        return MatchEngine(spotify_fetcher=get_spotify_fetcher(), ytm_fetcher=get_ytm_fetcher())
+    return shared("match_engine", build)
+
+def get_playlist_sync() -> "PlaylistSync":
+    """Shared PlaylistSync using the shared MatchEngine"""
+    def build():
+        from resync import PlaylistSync
+        return PlaylistSync(match_engine=get_match_engine())
+    return shared("playlist_sync", build)
+
+def close():
+    """Stop the worker processes of the shared engine, if it was ever built"""
+    engine = _instances.get("match_engine")
+    if engine is not None:
+        engine.scorer.close()
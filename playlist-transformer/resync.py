@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from match_cache import normalize_text
+from match_engine import MatchEngine
+
+DEFAULT_SYNC_PATH = os.environ.get("SYNC_STATE_PATH", "sync_state.db")
+
+def track_keys(tracks: List[Dict]) -> List[str]:
+    """Content hash of every track: normalized title and artist plus its occurrence number
+
+    The second copy of a song hashes differently from the first, so
+    duplicates are diffed one for one. The absolute position is left out:
+    with it, one track inserted near the top would change the hash of every
+    track below and turn a small edit into a full rewrite.
+    """
+    seen: Dict[str, int] = {}
+    keys = []
+    for track in tracks:
+        base = f"{normalize_text(track.get('title', ''))}|{normalize_text(track.get('artist', ''))}"
+        occurrence = seen.get(base, 0)
+        seen[base] = occurrence + 1
+        keys.append(hashlib.blake2b(f"{base}|{occurrence}".encode("utf-8"), digest_size=8).hexdigest())
+    return keys
+
+def playlist_url(target_platform: str, playlist_id: str) -> str:
+    if target_platform == "spotify":
+        return f"https://open.spotify.com/playlist/{playlist_id}"
+    return f"https://music.youtube.com/playlist?list={playlist_id}"
+
+def playlist_id_from_url(target_platform: str, url: str) -> Optional[str]:
+    """Playlist id in a URL built by playlist_url, None for any other URL"""
+    pattern = r"/playlist/([A-Za-z0-9]{22})\b" if target_platform == "spotify" else r"[?&]list=([\w-]+)"
+    found = re.search(pattern, url or "")
+    return found.group(1) if found else None
+
+class SyncStore:
+    """Last synced snapshot and target playlist id of every synced playlist, in SQLite"""
+
+    def __init__(self, path: str = DEFAULT_SYNC_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS syncs ("
+            "sync_key TEXT PRIMARY KEY, target_platform TEXT, playlist_id TEXT, "
+            "snapshot TEXT, updated_at REAL)"
+        )
+        self._conn.commit()
+
+    def get(self, sync_key: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT target_platform, playlist_id, snapshot, updated_at FROM syncs WHERE sync_key = ?",
+                (sync_key,)
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            "target_platform": row[0],
+            "playlist_id": row[1],
+            # [[track key, target track id or "" if it was not found], ...] in source order
+            "snapshot": json.loads(row[2]),
+            "updated_at": row[3]
+        }
+
+    def save(self, sync_key: str, target_platform: str, playlist_id: str, snapshot: List[List[str]]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO syncs VALUES (?, ?, ?, ?, ?)",
+                (sync_key, target_platform, playlist_id, json.dumps(snapshot, separators=(",", ":")), time.time())
+            )
+            self._conn.commit()
+
+    def delete(self, sync_key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM syncs WHERE sync_key = ?", (sync_key,))
+            self._conn.commit()
+
+class PlaylistSync:
+    """Keeps a target playlist in step with a source playlist across conversions
+
+    The first sync matches every track and creates the playlist. Later syncs
+    diff the source against the stored snapshot, match only the tracks that
+    are new (or were not found last time), append those and remove the
+    tracks that left the source. Appended tracks go to the end of the
+    target playlist; the snapshot is saved after every appended chunk, so a
+    sync that fails halfway never adds the same track twice.
+    """
+
+    def __init__(self, store: Optional[SyncStore] = None, match_engine: Optional[MatchEngine] = None):
+        self.store = store or SyncStore()
+        self.match_engine = match_engine or MatchEngine()
+
+    def _fetcher(self, target_platform: str):
+        if target_platform == "spotify":
+            return self.match_engine.spotify_fetcher
+        return self.match_engine.ytm_fetcher
+
+    def sync(self, sync_key: str, tracks: List[Dict], source_platform: str, target_platform: str,
+             name: str = "Converted Playlist") -> Dict:
+        """Bring the target playlist of ``sync_key`` up to date with ``tracks``, returns counts"""
+        state = self.store.get(sync_key)
+        if state and state["target_platform"] != target_platform:
+            state = None
+        previous = dict(state["snapshot"]) if state else {}
+
+        keys = track_keys(tracks)
+        current = set(keys)
+        to_match = [i for i, key in enumerate(keys) if not previous.get(key)]
+
+        matched_ids: Dict[str, str] = {}
+        if to_match:
+            matches = self.match_engine.match_tracks([tracks[i] for i in to_match], source_platform, target_platform)
+            for i, match in zip(to_match, matches):
+                found = match["status"] in ("matched", "low_confidence") and match["matched_id"]
+                matched_ids[keys[i]] = match["matched_id"] if found else ""
+
+        snapshot = [[key, previous.get(key) or matched_ids.get(key, "")] for key in keys]
+        added_keys = [keys[i] for i in to_match if matched_ids[keys[i]]]
+        added_ids = [matched_ids[key] for key in added_keys]
+        # Removal drops every copy of a track, so skip ids the playlist still needs
+        kept_ids = {target_id for _, target_id in snapshot}
+        removed_ids = list(dict.fromkeys(
+            target_id for key, target_id in previous.items()
+            if key not in current and target_id and target_id not in kept_ids
+        ))
+
+        fetcher = self._fetcher(target_platform)
+        playlist_id = state["playlist_id"] if state else ""
+        created = not playlist_id
+        if created:
+            playlist_id = fetcher.create_empty_playlist(name)
+            # Recorded before adding tracks, so a failed add never leads to a second playlist
+            self.store.save(sync_key, target_platform, playlist_id, [])
+
+        def save_progress(added: int):
+            # Tracks not added yet are stored as not found, so a failed sync matches and adds them next time
+            committed = set(added_keys[:added])
+            self.store.save(sync_key, target_platform, playlist_id, [
+                [key, target_id if key in committed or key not in matched_ids else ""]
+                for key, target_id in snapshot
+            ])
+
+        if removed_ids:
+            fetcher.remove_playlist_tracks(playlist_id, removed_ids)
+        if added_ids:
+            save_progress(0)
+            fetcher.add_playlist_tracks(playlist_id, added_ids, on_chunk=save_progress)
+
+        self.store.save(sync_key, target_platform, playlist_id, snapshot)
+
+        return {
+            "playlist_id": playlist_id,
+            "playlist_url": playlist_url(target_platform, playlist_id),
+            "created": created,
+            "matched": len(to_match),
+            "added": len(added_ids),
+            "removed": len(removed_ids),
+            "unchanged": len(tracks) - len(to_match),
+            "not_found": sum(1 for _, target_id in snapshot if not target_id)
+        }
+
+    def adopt(self, sync_key: str, tracks: List[Dict], target_platform: str, playlist_id: str,
+              matched_ids: Dict[str, str]):
+        """Record a playlist created outside sync() (by /confirm) as the target of ``sync_key``
+
+        ``matched_ids`` maps the source track ids to the target tracks the
+        playlist was created with; the other tracks count as not found, so
+        the next sync matches them again.
+        """
+        snapshot = [[key, matched_ids.get(track.get("id"), "")] for key, track in zip(track_keys(tracks), tracks)]
+        self.store.save(sync_key, target_platform, playlist_id, snapshot)
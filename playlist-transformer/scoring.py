@@ -0,0 +1,143 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+from catalog_index import CatalogIndex
+
+# Batches with fewer (query, candidate) pairs are scored in the calling thread,
+# below this a process round trip costs more than the scoring itself
+PARALLEL_MIN_PAIRS = int(os.environ.get("MATCH_SCORING_MIN_PAIRS", 20000))
+# Shards per worker process, so a slow shard doesn't leave the other cores idle
+SHARDS_PER_WORKER = 4
+
+def score_group(title: str, artist: str, titles: Sequence[str], artists: Sequence[str]) -> np.ndarray:
+    """Confidence (mean of title and artist ratio, 0-100) of every candidate against one query"""
+    if not len(titles):
+        return np.zeros(0)
+    # One cdist call per field scores every candidate at once
+    title_scores = process.cdist([title], titles, scorer=fuzz.ratio, processor=str.lower)[0]
+    artist_scores = process.cdist([artist], artists, scorer=fuzz.ratio, processor=str.lower)[0]
+    return (title_scores.astype(np.float64) + artist_scores) / 2
+
+def score_rows(catalog: CatalogIndex, queries: Sequence[Tuple[str, str]], rows: np.ndarray,
+               sizes: np.ndarray) -> np.ndarray:
+    """Score each query against its own slice of catalog ``rows`` (``sizes`` long each), back to back"""
+    scores = []
+    start = 0
+    for (title, artist), size in zip(queries, sizes):
+        records = catalog.get_fields(rows[start:start + size])
+        scores.append(score_group(title, artist, [r[0] for r in records], [r[1] for r in records]))
+        start += size
+    return np.concatenate(scores) if scores else np.zeros(0)
+
+# Catalogs opened by this worker process, by index directory
+_worker_catalogs: Dict[str, CatalogIndex] = {}
+
+def _score_shard(index_dir: str, queries: List[Tuple[str, str]], rows: np.ndarray, sizes: np.ndarray) -> np.ndarray:
+    """Worker side of ParallelScorer.score_rows"""
+    catalog = _worker_catalogs.get(index_dir)
+    if catalog is None:
+        # Memory-mapped, so every worker shares the parent's page cache instead of a copy
+        catalog = _worker_catalogs[index_dir] = CatalogIndex(index_dir)
+    return score_rows(catalog, queries, rows, sizes)
+
+def _shards(sizes: np.ndarray, count: int) -> List[Tuple[int, int]]:
+    """Split queries into up to ``count`` contiguous ranges of about the same number of pairs"""
+    ends = np.cumsum(sizes)
+    bounds = np.searchsorted(ends, np.linspace(0, ends[-1], count + 1)[1:], side="left") + 1
+    # Trailing queries without candidates go with the last shard
+    bounds[-1] = len(sizes)
+    shards = []
+    lo = 0
+    for hi in np.minimum(bounds, len(sizes)):
+        if hi > lo:
+            shards.append((lo, int(hi)))
+            lo = int(hi)
+    return shards
+
+class ParallelScorer:
+    """Scores batches of queries against catalog candidates on a pool of worker processes
+
+    rapidfuzz holds the GIL between calls, so threads can't spread many small
+    cdist calls over cores. Candidates travel as arrays of catalog row ids
+    (4 bytes each) rather than string lists; each worker opens the memory-
+    mapped catalog once and decodes the rows itself, so the parent only does
+    the sharding. Small batches, or a pool that failed, are scored in the
+    calling thread; a broken pool is replaced on the next large batch.
+    """
+
+    def __init__(self, workers: Optional[int] = None, min_pairs: int = PARALLEL_MIN_PAIRS):
+        self.workers = workers or int(os.environ.get("MATCH_SCORING_WORKERS", os.cpu_count() or 1))
+        self.min_pairs = min_pairs
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a process that runs server and driver threads is unsafe
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context("spawn"))
+            return self._executor
+
+    def score_rows(self, catalog: CatalogIndex, queries: Sequence[Tuple[str, str]],
+                   row_lists: Sequence[np.ndarray]) -> List[np.ndarray]:
+        """Confidences of each query's candidate rows, in row order"""
+        sizes = np.array([len(rows) for rows in row_lists], dtype=np.int64)
+        rows = np.concatenate(row_lists).astype(np.uint32) if len(row_lists) else np.zeros(0, dtype=np.uint32)
+        pairs = int(sizes.sum())
+        scores = None
+        if self.workers > 1 and pairs and pairs >= self.min_pairs:
+            executor = None
+            try:
+                executor = self._get_executor()
+                scores = self._score_parallel(executor, catalog, queries, rows, sizes)
+            except Exception as e:
+                print(f"Error scoring on worker processes, scoring inline: {e}")
+                if isinstance(e, BrokenProcessPool):
+                    # A dead worker breaks the pool for good; drop it so the next batch starts a new one
+                    self._discard(executor)
+        if scores is None:
+            scores = score_rows(catalog, queries, rows, sizes)
+        return np.split(scores, np.cumsum(sizes)[:-1])
+
+    def _score_parallel(self, executor: ProcessPoolExecutor, catalog: CatalogIndex,
+                        queries: Sequence[Tuple[str, str]], rows: np.ndarray, sizes: np.ndarray) -> np.ndarray:
+        starts = np.concatenate(([0], np.cumsum(sizes)))
+        futures = [
+            executor.submit(_score_shard, catalog.index_dir, list(queries[lo:hi]),
+                            rows[starts[lo]:starts[hi]], sizes[lo:hi])
+            for lo, hi in _shards(sizes, self.workers * SHARDS_PER_WORKER)
+        ]
+        return np.concatenate([future.result() for future in futures])
+
+    def _discard(self, executor: Optional[ProcessPoolExecutor]):
+        """Shut down ``executor`` and forget it, unless another thread already replaced it"""
+        with self._lock:
+            if executor is None or self._executor is not executor:
+                return
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+_scorer = None
+_scorer_lock = threading.Lock()
+
+def get_scorer() -> ParallelScorer:
+    """Return the process-wide scorer; worker processes start on the first large batch"""
+    global _scorer
+    if _scorer is None:
+        with _scorer_lock:
+            if _scorer is None:
+                _scorer = ParallelScorer()
+    return _scorer
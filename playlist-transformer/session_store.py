@@ -0,0 +1,441 @@
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from dataclasses import fields
+from typing import Any, Callable, Dict, Iterable, Optional, Type
+
+from tracks import json_default
+
+# Rough resident cost of one track/library item (a slotted Track and its title and id strings)
+ITEM_BYTES = 384
+
+def _count_items(value: Any) -> int:
+    """Number of track-sized items in a track list or a library of sections"""
+    if isinstance(value, list):
+        return len(value)
+    if not isinstance(value, dict):
+        return 0
+    total = 0
+    for section in value.values():
+        if isinstance(section, dict):
+            # One per entry, plus the tracks a playlist carries
+            total += sum(1 + len(item.get("tracks") or []) if isinstance(item, dict) else 1
+                         for item in section.values())
+    return total
+
+class _Entry:
+    __slots__ = ("session", "last_access", "spilled")
+
+    def __init__(self, session: Any):
+        self.session = session
+        self.last_access = time.time()
+        self.spilled = False
+
+class SessionStore:
+    """Session container with unique ids, idle expiry and a memory budget
+
+    Behaves like the dict it replaces (``in``, ``[]``, ``del``, ``len``).
+    Sessions untouched for ``idle_ttl`` seconds are evicted and handed to
+    ``on_evict`` so they can release browsers and jobs. When the estimated
+    size of resident sessions exceeds ``memory_budget`` bytes, the large
+    ``spill_fields`` of the least recently used sessions are pickled to
+    ``spill_dir`` and loaded back transparently on their next access.
+    """
+
+    def __init__(self, idle_ttl: float = 3600, memory_budget: int = 512 * 1024 * 1024,
+                 spill_dir: str = "session_spill",
+                 spill_fields: Iterable[str] = ("source_library", "matched_tracks"),
+                 on_evict: Optional[Callable[[Any], None]] = None):
+        self.idle_ttl = idle_ttl
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self.spill_fields = tuple(spill_fields)
+        self.on_evict = on_evict
+
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.RLock()
+
+        self.evictions = 0
+        self.spills = 0
+        self.restores = 0
+
+    def create(self, session: Any) -> str:
+        """Store a new session under a fresh unique id"""
+        self.sweep()
+        session_id = f"session_{uuid.uuid4().hex}"
+        with self._lock:
+            self._entries[session_id] = _Entry(session)
+        return session_id
+
+    def get(self, session_id: str) -> Optional[Any]:
+        """Return a session (restoring spilled data) and mark it as recently used"""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            if time.time() - entry.last_access > self.idle_ttl:
+                self._evict(session_id)
+                return None
+
+            entry.last_access = time.time()
+            if entry.spilled:
+                self._restore(session_id, entry)
+
+        self._enforce_budget(keep=session_id)
+        return entry.session
+
+    def __contains__(self, session_id: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(session_id)
+            return entry is not None and time.time() - entry.last_access <= self.idle_ttl
+
+    def __getitem__(self, session_id: str) -> Any:
+        session = self.get(session_id)
+        if session is None:
+            raise KeyError(session_id)
+        return session
+
+    def save(self, session_id: str, session: Any):
+        """Persist changes made to a session; in memory they already are, so only touch it"""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                entry.last_access = time.time()
+
+    def __delitem__(self, session_id: str):
+        """Remove a session without calling on_evict (the caller cleans it up)"""
+        with self._lock:
+            self._entries.pop(session_id)
+            self._remove_spill_file(session_id)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def sweep(self):
+        """Evict idle sessions and spill the least recently used ones over budget"""
+        cutoff = time.time() - self.idle_ttl
+        with self._lock:
+            for session_id in [sid for sid, e in self._entries.items() if e.last_access < cutoff]:
+                self._evict(session_id)
+        self._enforce_budget()
+
+    def close(self):
+        """Evict every session, e.g. on shutdown"""
+        with self._lock:
+            for session_id in list(self._entries):
+                self._evict(session_id)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "sessions": len(self._entries),
+                "spilled": sum(1 for e in self._entries.values() if e.spilled),
+                "resident_bytes_estimate": self._resident_bytes(),
+                "memory_budget": self.memory_budget,
+                "evictions": self.evictions,
+                "spills": self.spills,
+                "restores": self.restores
+            }
+
+    def _estimate_bytes(self, entry: _Entry) -> int:
+        if entry.spilled:
+            return 0
+        return sum(_count_items(getattr(entry.session, f, None)) for f in self.spill_fields) * ITEM_BYTES
+
+    def _resident_bytes(self) -> int:
+        return sum(self._estimate_bytes(e) for e in self._entries.values())
+
+    def _enforce_budget(self, keep: Optional[str] = None):
+        """Spill least recently used sessions until the estimate fits the budget"""
+        with self._lock:
+            resident = self._resident_bytes()
+            if resident <= self.memory_budget:
+                return
+            by_age = sorted(self._entries.items(), key=lambda item: item[1].last_access)
+            for session_id, entry in by_age:
+                if resident <= self.memory_budget:
+                    break
+                if session_id == keep or entry.spilled:
+                    continue
+                size = self._estimate_bytes(entry)
+                if size and self._spill(session_id, entry):
+                    resident -= size
+
+    def _spill_path(self, session_id: str) -> str:
+        return os.path.join(self.spill_dir, f"{session_id}.pkl")
+
+    def _spill(self, session_id: str, entry: _Entry) -> bool:
+        data = {f: getattr(entry.session, f, None) for f in self.spill_fields}
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            with open(self._spill_path(session_id), "wb") as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            print(f"Error spilling session {session_id}: {e}")
+            return False
+
+        for field in self.spill_fields:
+            setattr(entry.session, field, None)
+        entry.spilled = True
+        self.spills += 1
+        return True
+
+    def _restore(self, session_id: str, entry: _Entry):
+        try:
+            with open(self._spill_path(session_id), "rb") as f:
+                data = pickle.load(f)
+        except Exception as e:
+            print(f"Error restoring session {session_id}: {e}")
+            data = {}
+
+        for field, value in data.items():
+            # A background job may have filled the field in while it was spilled
+            if getattr(entry.session, field, None) is None:
+                setattr(entry.session, field, value)
+        entry.spilled = False
+        self.restores += 1
+        self._remove_spill_file(session_id)
+
+    def _remove_spill_file(self, session_id: str):
+        try:
+            os.remove(self._spill_path(session_id))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error removing spilled session {session_id}: {e}")
+
+    def _evict(self, session_id: str):
+        """Drop a session and let on_evict release what it holds, caller holds the lock"""
+        entry = self._entries.pop(session_id)
+        self._remove_spill_file(session_id)
+        self.evictions += 1
+        if self.on_evict:
+            try:
+                self.on_evict(entry.session)
+            except Exception as e:
+                print(f"Error cleaning up session {session_id}: {e}")
+
+class SQLiteSessionStore:
+    """Session store in a SQLite file, shared by every worker process on the host
+
+    Same interface as SessionStore, but changes must be written back with
+    save(). Sessions are stored as zlib-compressed compact JSON of the
+    dataclass fields. ``local_fields`` (e.g. a live login browser) cannot be
+    serialized: they stay with the process that set them and read as None
+    elsewhere. Recently used sessions are kept decoded in a small per-process
+    cache, checked against the row version so other workers' writes are seen.
+    """
+
+    # Last-access writes are skipped when the previous one is this recent
+    TOUCH_INTERVAL = 5
+
+    def __init__(self, session_type: Type, path: str = "sessions.db", idle_ttl: float = 3600,
+                 local_fields: Iterable[str] = ("auth_manager",), cache_size: int = 32,
+                 on_evict: Optional[Callable[[Any], None]] = None):
+        self.session_type = session_type
+        self.path = path
+        self.idle_ttl = idle_ttl
+        self.local_fields = tuple(local_fields)
+        self.cache_size = cache_size
+        self.on_evict = on_evict
+
+        # session_id -> (version, session), most recently used last
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        # Sessions whose local fields are set in this process, never dropped from memory
+        self._pinned: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+        self.evictions = 0
+
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "id TEXT PRIMARY KEY, data BLOB, version TEXT, last_access REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_access ON sessions (last_access)")
+        self._conn.commit()
+
+    def _encode(self, session: Any) -> bytes:
+        data = {f.name: getattr(session, f.name) for f in fields(session) if f.name not in self.local_fields}
+        return zlib.compress(json.dumps(data, separators=(",", ":"), default=json_default).encode("utf-8"))
+
+    def _decode(self, blob: bytes) -> Any:
+        return self.session_type(**json.loads(zlib.decompress(blob).decode("utf-8")))
+
+    def _remember(self, session_id: str, version: str, session: Any):
+        """Cache a decoded session and pin it while it holds process-local objects"""
+        self._cache[session_id] = (version, session)
+        self._cache.move_to_end(session_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+        if any(getattr(session, f, None) is not None for f in self.local_fields):
+            self._pinned[session_id] = session
+        else:
+            self._pinned.pop(session_id, None)
+
+    def create(self, session: Any) -> str:
+        """Store a new session under a fresh unique id"""
+        self.sweep()
+        session_id = f"session_{uuid.uuid4().hex}"
+        version = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO sessions (id, data, version, last_access) VALUES (?, ?, ?, ?)",
+                (session_id, self._encode(session), version, time.time())
+            )
+            self._conn.commit()
+            self._remember(session_id, version, session)
+        return session_id
+
+    def save(self, session_id: str, session: Any):
+        """Write a changed session back so other workers see it (no-op if it was removed)"""
+        version = uuid.uuid4().hex
+        with self._lock:
+            try:
+                updated = self._conn.execute(
+                    "UPDATE sessions SET data = ?, version = ?, last_access = ? WHERE id = ?",
+                    (self._encode(session), version, time.time(), session_id)
+                ).rowcount
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"Error saving session {session_id}: {e}")
+                return
+            if updated:
+                self._remember(session_id, version, session)
+            else:
+                self._forget(session_id)
+
+    def get(self, session_id: str) -> Optional[Any]:
+        """Return a session, decoding it only if another worker changed it"""
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT version, last_access FROM sessions WHERE id = ?", (session_id,)
+                ).fetchone()
+                if not row:
+                    self._forget(session_id)
+                    return None
+
+                version, last_access = row
+                if now - last_access > self.idle_ttl:
+                    self._evict([session_id])
+                    return None
+                if now - last_access > self.TOUCH_INTERVAL:
+                    self._conn.execute("UPDATE sessions SET last_access = ? WHERE id = ?", (now, session_id))
+                    self._conn.commit()
+
+                cached = self._cache.get(session_id)
+                if cached and cached[0] == version:
+                    self._cache.move_to_end(session_id)
+                    return cached[1]
+
+                blob = self._conn.execute("SELECT data FROM sessions WHERE id = ?", (session_id,)).fetchone()[0]
+                session = self._decode(blob)
+                self._attach_local(session_id, session)
+                self._remember(session_id, version, session)
+                return session
+
+            except sqlite3.Error as e:
+                print(f"Error reading session {session_id}: {e}")
+                return None
+
+    def _attach_local(self, session_id: str, session: Any):
+        """Carry this process's local fields over to a freshly decoded copy"""
+        pinned = self._pinned.get(session_id)
+        for field in self.local_fields:
+            setattr(session, field, getattr(pinned, field, None) if pinned is not None else None)
+
+    def _forget(self, session_id: str):
+        self._cache.pop(session_id, None)
+        self._pinned.pop(session_id, None)
+
+    def __contains__(self, session_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT last_access FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return row is not None and time.time() - row[0] <= self.idle_ttl
+
+    def __getitem__(self, session_id: str) -> Any:
+        session = self.get(session_id)
+        if session is None:
+            raise KeyError(session_id)
+        return session
+
+    def __delitem__(self, session_id: str):
+        """Remove a session without calling on_evict (the caller cleans it up)"""
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            self._conn.commit()
+            self._forget(session_id)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def sweep(self):
+        """Evict idle sessions, and release local objects of sessions another worker evicted"""
+        cutoff = time.time() - self.idle_ttl
+        with self._lock:
+            try:
+                expired = [row[0] for row in self._conn.execute(
+                    "SELECT id FROM sessions WHERE last_access < ?", (cutoff,)
+                )]
+                self._evict(expired)
+
+                for session_id in list(self._pinned):
+                    if not self._conn.execute("SELECT 1 FROM sessions WHERE id = ?", (session_id,)).fetchone():
+                        self._release(session_id, self._pinned[session_id])
+                        self._forget(session_id)
+            except sqlite3.Error as e:
+                print(f"Error sweeping sessions: {e}")
+
+    def close(self):
+        """Release this process's local objects; the shared sessions stay for other workers"""
+        with self._lock:
+            for session_id, session in list(self._pinned.items()):
+                self._release(session_id, session)
+            self._pinned.clear()
+            self._cache.clear()
+            self._conn.close()
+
+    def stats(self) -> Dict:
+        return {
+            "backend": "sqlite",
+            "sessions": len(self),
+            "cached": len(self._cache),
+            "pinned": len(self._pinned),
+            "evictions": self.evictions
+        }
+
+    def _evict(self, session_ids: Iterable[str]):
+        """Delete sessions and hand them to on_evict, caller holds the lock"""
+        for session_id in session_ids:
+            row = self._conn.execute("SELECT data FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            # Another worker may be evicting the same session, only one of us wins the delete
+            if not row or not self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,)).rowcount:
+                continue
+            self._conn.commit()
+
+            session = self._pinned.get(session_id)
+            if session is None:
+                session = self._decode(row[0])
+                self._attach_local(session_id, session)
+            self._forget(session_id)
+            self.evictions += 1
+            self._release(session_id, session)
+        self._conn.commit()
+
+    def _release(self, session_id: str, session: Any):
+        if self.on_evict:
+            try:
+                self.on_evict(session)
+            except Exception as e:
+                print(f"Error cleaning up session {session_id}: {e}")
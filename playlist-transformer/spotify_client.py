@@ -0,0 +1,281 @@
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional
+
+from tracks import Track
+
+API_BASE_URL = os.environ.get("SPOTIFY_API_URL", "https://api.spotify.com/v1")
+TOKEN_URL = os.environ.get(
+    "SPOTIFY_TOKEN_URL",
+    "https://open.spotify.com/get_access_token?reason=transport&productType=web_player"
+)
+
+def _load_saved_cookies() -> List[Dict]:
+    """Cookies saved by AuthManager after a Spotify login"""
+    from auth_browser import AuthManager
+    return AuthManager().get_spotify_cookies() or []
+
+class SpotifyWebClient:
+    """Keep-alive HTTP client for Spotify's JSON web endpoints
+
+    Authenticates with the cookies AuthManager saved at login: they are
+    exchanged for a short-lived web player access token, which is refreshed
+    on expiry or on a 401. Connections are pooled in one requests.Session,
+    so paginated reads and chunked writes reuse the same sockets.
+    Both URLs can be pointed at a local stand-in server.
+    """
+
+    def __init__(self, cookie_loader: Callable[[], List[Dict]] = _load_saved_cookies,
+                 api_base_url: str = API_BASE_URL, token_url: str = TOKEN_URL,
+                 pool_size: int = 10, page_size: int = 50, timeout: float = 15):
+        self.cookie_loader = cookie_loader
+        self.api_base_url = api_base_url.rstrip("/")
+        self.token_url = token_url
+        self.page_size = page_size
+        self.timeout = timeout
+
+        # requests is only imported once Spotify is used, it is slow to import
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._token = None
+        self._token_expires = 0.0
+        self._token_lock = threading.Lock()
+        self._user_id = None
+
+    def invalidate(self):
+        """Forget the token and user id, e.g. after a login to another account changed the cookies"""
+        with self._token_lock:
+            self._token = None
+            self._token_expires = 0.0
+            self._user_id = None
+
+    def _access_token(self, refresh: bool = False) -> str:
+        """Return a valid access token, exchanging the login cookies for a new one if needed"""
+        with self._token_lock:
+            if refresh or not self._token or time.time() >= self._token_expires - 60:
+                cookies = {c["name"]: c["value"] for c in self.cookie_loader() if "name" in c}
+                if not cookies:
+                    raise RuntimeError("No Spotify cookies saved, log in first")
+
+                response = self.session.get(self.token_url, cookies=cookies, timeout=self.timeout)
+                response.raise_for_status()
+                data = response.json()
+                if data.get("isAnonymous") or not data.get("accessToken"):
+                    raise RuntimeError("Spotify cookies are no longer logged in")
+
+                self._token = data["accessToken"]
+                self._token_expires = data.get("accessTokenExpirationTimestampMs", 0) / 1000 or time.time() + 3000
+            return self._token
+
+    def _request(self, method: str, path_or_url: str, **kwargs) -> Dict:
+        """Authenticated request, retrying once on 401 and on 429 after Retry-After"""
+        url = path_or_url if path_or_url.startswith("http") else f"{self.api_base_url}{path_or_url}"
+        refresh = refreshed = False
+
+        for _ in range(5):
+            headers = {"Authorization": f"Bearer {self._access_token(refresh=refresh)}"}
+            refresh = False
+            response = self.session.request(method, url, headers=headers, timeout=self.timeout, **kwargs)
+
+            if response.status_code == 401 and not refreshed:
+                # Token revoked or expired early, get a new one once
+                refresh = refreshed = True
+                continue
+            if response.status_code == 429:
+                time.sleep(float(response.headers.get("Retry-After", 1)))
+                continue
+
+            response.raise_for_status()
+            return response.json() if response.content else {}
+
+        response.raise_for_status()
+        return {}
+
+    def _paginate(self, path: str, params: Optional[Dict] = None, key: Optional[str] = None) -> Iterator[List[Dict]]:
+        """Yield pages of items, following each response's 'next' URL to the end"""
+        url = path
+        params = dict(params or {}, limit=self.page_size)
+
+        while url:
+            data = self._request("GET", url, params=params)
+            if key:
+                data = data.get(key, {})
+            yield data.get("items", [])
+            url = data.get("next")
+            # The next URL already carries offset/cursor and limit
+            params = None
+
+    def user_id(self) -> str:
+        if not self._user_id:
+            self._user_id = self._request("GET", "/me")["id"]
+        return self._user_id
+
+    @staticmethod
+    def _to_track(item: Dict, **fields) -> Track:
+        """Flatten a Web API track object, ``fields`` (e.g. type, id) are set on the result"""
+        return Track(
+            title=item.get("name", ""),
+            artist=(item.get("artists") or [{}])[0].get("name", ""),
+            album=(item.get("album") or {}).get("name", ""),
+            duration_ms=item.get("duration_ms", 0),
+            isrc=(item.get("external_ids") or {}).get("isrc", ""),
+            uri=item.get("uri", ""),
+            **fields
+        )
+
+    def iter_liked_songs(self) -> Iterator[List[Track]]:
+        """Yield liked songs page by page, numbered liked_0, liked_1, ..."""
+        index = 0
+        for page in self._paginate("/me/tracks"):
+            tracks = []
+            for item in page:
+                if not item.get("track"):
+                    continue
+                tracks.append(self._to_track(item["track"], type="liked_song", id=f"liked_{index}"))
+                index += 1
+            yield tracks
+
+    def iter_playlist_tracks(self, playlist_id: str) -> Iterator[List[Track]]:
+        """Yield a playlist's tracks page by page"""
+        for page in self._paginate(f"/playlists/{playlist_id}/tracks"):
+            # Local files and removed tracks come back with track = null
+            yield [self._to_track(item["track"]) for item in page if item.get("track")]
+
+    def get_library(self) -> Dict:
+        """Fetch the library in the same shape as SpotifyFetcher.get_library"""
+        return {
+            "playlists": self.get_playlists(),
+            "liked_songs": self.get_liked_songs(),
+            "albums": self.get_albums(),
+            "artists": self.get_artists(),
+            "tracks": {}
+        }
+
+    def get_liked_songs(self) -> Dict[str, Track]:
+        """Liked songs by id (liked_0, liked_1, ...)"""
+        liked_songs = {}
+        for page in self.iter_liked_songs():
+            for track in page:
+                liked_songs[track.id] = track
+        return liked_songs
+
+    def get_playlists(self) -> Dict[str, Dict]:
+        """Every playlist with its tracks"""
+        import requests
+
+        playlists = {}
+        i = 0
+        for page in self._paginate("/me/playlists"):
+            for playlist in page:
+                tracks = []
+                try:
+                    for track_page in self.iter_playlist_tracks(playlist["id"]):
+                        tracks.extend(track_page)
+                except requests.RequestException as e:
+                    print(f"Error fetching tracks for playlist {playlist.get('name', '')}: {e}")
+                for j, track in enumerate(tracks):
+                    track.id = f"track_{j}"
+
+                playlist_id = f"playlist_{i}"
+                playlists[playlist_id] = {
+                    "name": playlist.get("name", ""),
+                    "type": "playlist",
+                    "id": playlist_id,
+                    "uri": playlist.get("uri", ""),
+                    "tracks": tracks
+                }
+                i += 1
+        return playlists
+
+    def get_albums(self) -> Dict[str, Dict]:
+        """Saved albums"""
+        albums = {}
+        i = 0
+        for page in self._paginate("/me/albums"):
+            for item in page:
+                album = item.get("album") or {}
+                album_id = f"album_{i}"
+                albums[album_id] = {
+                    "name": album.get("name", ""),
+                    "artist": (album.get("artists") or [{}])[0].get("name", ""),
+                    "type": "album",
+                    "id": album_id,
+                    "uri": album.get("uri", "")
+                }
+                i += 1
+        return albums
+
+    def get_artists(self) -> Dict[str, Dict]:
+        """Followed artists"""
+        artists = {}
+        i = 0
+        for page in self._paginate("/me/following", {"type": "artist"}, key="artists"):
+            for artist in page:
+                artist_id = f"artist_{i}"
+                artists[artist_id] = {
+                    "name": artist.get("name", ""),
+                    "type": "artist",
+                    "id": artist_id,
+                    "uri": artist.get("uri", "")
+                }
+                i += 1
+        return artists
+
+    def search_track(self, title: str, artist: str, limit: int = 5) -> List[Dict]:
+        """Search tracks, returns candidates in Spotify's ranking order"""
+        data = self._request("GET", "/search", params={
+            "q": f"track:{title} artist:{artist}",
+            "type": "track",
+            "limit": limit
+        })
+        candidates = []
+        for item in data.get("tracks", {}).get("items", []):
+            candidates.append(self._to_track(item, id=item.get("id", "")))
+        return candidates
+
+    def create_playlist(self, name: str, description: str = "") -> Dict:
+        """Create an empty private playlist, returns the Web API playlist object"""
+        return self._request("POST", f"/users/{self.user_id()}/playlists", json={
+            "name": name,
+            "description": description,
+            "public": False
+        })
+
+    def add_tracks(self, playlist_id: str, uris: List[str], chunk_size: int = 100,
+                   on_chunk: Optional[Callable[[int], None]] = None):
+        """Append tracks in chunks (the endpoint accepts at most 100 per request)
+
+        ``on_chunk(added)`` is called after each chunk with the number of
+        tracks added so far.
+        """
+        for start in range(0, len(uris), chunk_size):
+            chunk = uris[start:start + chunk_size]
+            self._request("POST", f"/playlists/{playlist_id}/tracks", json={"uris": chunk})
+            if on_chunk:
+                on_chunk(start + len(chunk))
+
+    def remove_tracks(self, playlist_id: str, uris: List[str], chunk_size: int = 100):
+        """Remove every occurrence of the given tracks, in chunks of at most 100"""
+        for start in range(0, len(uris), chunk_size):
+            self._request("DELETE", f"/playlists/{playlist_id}/tracks", json={
+                "tracks": [{"uri": uri} for uri in uris[start:start + chunk_size]]
+            })
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_spotify_client() -> SpotifyWebClient:
+    """Process-wide client, so every fetcher shares one connection pool and token"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = SpotifyWebClient()
+    return _client
@@ -0,0 +1,14 @@
+import os
+import sys
+import tempfile
+
+# The app is a flat set of modules run from its own directory (templates/ and static/ are relative)
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+os.chdir(APP_DIR)
+
+# Keep the SQLite stores the modules open by default out of the working tree
+_state_dir = tempfile.mkdtemp(prefix="playlist-transformer-tests-")
+for _name, _file in (("MATCH_CACHE_PATH", "match_cache.db"), ("CONFIRMED_MATCHES_PATH", "confirmed_matches.db"),
+                     ("SYNC_STATE_PATH", "sync_state.db"), ("SESSION_DB_PATH", "sessions.db")):
+    os.environ.setdefault(_name, os.path.join(_state_dir, _file))
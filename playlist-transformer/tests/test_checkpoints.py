@@ -0,0 +1,55 @@
+import time
+
+import pytest
+
+import fetch_ytm
+from checkpoints import WriteCheckpoints, write_key
+from fetch_ytm import YTMFetcher
+
+def test_checkpoints_expire_after_the_ttl():
+    checkpoints = WriteCheckpoints(":memory:", ttl=60)
+    checkpoints.save("fresh", "PL1", 100)
+    checkpoints.save("stale", "PL2", 100)
+    checkpoints._conn.execute("UPDATE playlist_writes SET updated_at = ? WHERE write_key = 'stale'",
+                              (time.time() - 120,))
+
+    assert checkpoints.get("fresh") == ("PL1", 100)
+    assert checkpoints.get("stale") is None
+
+class FakeYTMusic:
+    """Playlist writes against a set of existing playlists, 404 for any other"""
+
+    def __init__(self):
+        self.playlists = {}
+
+    def create_playlist(self, name, description):
+        playlist_id = f"PL{len(self.playlists)}"
+        self.playlists[playlist_id] = []
+        return playlist_id
+
+    def add_playlist_items(self, playlist_id, video_ids, duplicates=False):
+        if playlist_id not in self.playlists:
+            raise Exception("Server returned HTTP 404: Not Found. Requested entity was not found.")
+        self.playlists[playlist_id].extend(video_ids)
+        return {"status": "STATUS_SUCCEEDED"}
+
+@pytest.fixture
+def checkpoints(monkeypatch):
+    checkpoints = WriteCheckpoints(":memory:")
+    monkeypatch.setattr(fetch_ytm, "get_write_checkpoints", lambda: checkpoints)
+    return checkpoints
+
+def test_a_deleted_playlist_drops_its_checkpoint(checkpoints):
+    fetcher = YTMFetcher()
+    fetcher.ytm = FakeYTMusic()
+    playlist = {"name": "Mix", "tracks": [{"ytm_id": f"v{i}"} for i in range(3)]}
+    key = write_key("ytm", "Mix", ["v0", "v1", "v2"])
+    # An earlier attempt got one track into a playlist that has since been deleted
+    checkpoints.save(key, "PLdeleted", 1)
+
+    assert fetcher.create_playlist(playlist) == ""
+    assert checkpoints.get(key) is None
+
+    url = fetcher.create_playlist(playlist)
+    assert url.endswith("list=PL0")
+    assert fetcher.ytm.playlists["PL0"] == ["v0", "v1", "v2"]
@@ -0,0 +1,43 @@
+import pytest
+
+import api
+from confirmed_matches import ConfirmedMatches
+from tracks import MatchEntry, Track
+
+@pytest.fixture
+def confirmed(monkeypatch):
+    index = ConfirmedMatches(":memory:")
+    monkeypatch.setattr(api, "get_confirmed_matches", lambda: index)
+    return index
+
+def _session(selected):
+    # Spotify numbers each playlist's tracks from track_0, so ids repeat across playlists
+    library = {"playlists": {
+        "playlist_0": {"name": "First", "tracks": [
+            Track(title="Song A", artist="Artist A", duration_ms=200000, isrc="AAA", id="track_0")
+        ]},
+        "playlist_1": {"name": "Second", "tracks": [
+            Track(title="Song Z", artist="Artist Z", duration_ms=180000, isrc="ZZZ", id="track_0")
+        ]}
+    }}
+    return api.ConversionSession(source_platform="spotify", target_platform="ytm",
+                                 source_library=library, selected_tracks=selected)
+
+def _matched(title, artist, target_id):
+    return MatchEntry(original_id="track_0", original_title=title, original_artist=artist,
+                      matched_title=title, matched_artist=artist, matched_id=target_id,
+                      confidence=95.0, status="matched")
+
+def test_records_the_selected_playlists_track(confirmed):
+    api.record_confirmed_matches(_session(["playlist_0"]), [_matched("Song A", "Artist A", "yt_a")])
+
+    song_a = Track(title="Song A", artist="Artist A", duration_ms=200000, isrc="AAA")
+    song_z = Track(title="Song Z", artist="Artist Z", duration_ms=180000, isrc="ZZZ")
+    (tier_a, result_a), (tier_z, result_z) = confirmed.lookup_many([song_a, song_z], "ytm")
+    assert tier_a == "isrc" and result_a["id"] == "yt_a"
+    assert tier_z is None and result_z is None
+
+def test_skips_ids_shared_by_several_selected_tracks(confirmed):
+    api.record_confirmed_matches(_session(["playlist_0", "playlist_1"]), [_matched("Song A", "Artist A", "yt_a")])
+
+    assert confirmed.stats()["entries"] == 0
@@ -0,0 +1,146 @@
+import threading
+import time
+
+import pytest
+
+from driver_pool import DriverPool
+
+class FakeDriver:
+    """Stand-in WebDriver: answers the default health check until it is killed"""
+
+    def __init__(self, number):
+        self.number = number
+        self.alive = True
+        self.quit_calls = 0
+
+    @property
+    def current_url(self):
+        if not self.alive:
+            raise RuntimeError("browser is gone")
+        return "about:blank"
+
+    def quit(self):
+        self.quit_calls += 1
+        self.alive = False
+
+class FakeFactory:
+    def __init__(self):
+        self.drivers = []
+
+    def __call__(self):
+        driver = FakeDriver(len(self.drivers))
+        self.drivers.append(driver)
+        return driver
+
+@pytest.fixture
+def factory():
+    return FakeFactory()
+
+def test_reuses_a_released_driver(factory):
+    pool = DriverPool(factory, max_size=2)
+
+    with pool.driver() as first:
+        pass
+    with pool.driver() as second:
+        pass
+
+    assert second is first
+    assert pool.stats()["created"] == 1
+
+def test_recycles_a_driver_after_max_uses(factory):
+    pool = DriverPool(factory, max_size=1, max_uses=2)
+
+    used = []
+    for _ in range(3):
+        with pool.driver() as driver:
+            used.append(driver)
+
+    assert used[0] is used[1] and used[2] is not used[0]
+    assert used[0].quit_calls == 1
+    assert pool.stats()["recycled"] == 1
+
+def test_reaps_drivers_idle_past_the_timeout(factory):
+    pool = DriverPool(factory, max_size=2, idle_timeout=0.05)
+    with pool.driver() as driver:
+        pass
+
+    pool.reap_idle()
+    assert pool.stats()["idle"] == 1
+
+    time.sleep(0.1)
+    pool.reap_idle()
+    assert driver.quit_calls == 1
+    assert pool.stats()["idle"] == 0 and pool.stats()["live"] == 0
+
+def test_discards_a_driver_that_fails_its_health_check(factory):
+    pool = DriverPool(factory, max_size=1)
+    with pool.driver() as crashed:
+        pass
+    crashed.alive = False
+
+    with pool.driver() as driver:
+        assert driver is not crashed
+        assert driver.alive
+
+    assert pool.stats()["health_check_failures"] == 1
+    assert pool.stats()["live"] == 1
+
+def test_discards_a_driver_released_after_an_error(factory):
+    pool = DriverPool(factory, max_size=1)
+
+    with pytest.raises(ValueError):
+        with pool.driver() as broken:
+            raise ValueError("page crashed")
+
+    assert broken.quit_calls == 1
+    with pool.driver() as driver:
+        assert driver is not broken
+
+def test_invalidate_retires_idle_and_checked_out_drivers(factory):
+    pool = DriverPool(factory, max_size=2)
+    idle, in_use = pool.acquire(), pool.acquire()
+    pool.release(idle)
+
+    pool.invalidate()
+    assert idle.quit_calls == 1
+
+    # Primed before invalidate(), so it is not pooled again
+    pool.release(in_use)
+    assert in_use.quit_calls == 1
+    with pool.driver() as driver:
+        assert driver not in (idle, in_use)
+
+def test_acquire_times_out_when_the_pool_is_exhausted(factory):
+    pool = DriverPool(factory, max_size=1)
+    pool.acquire()
+
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.1)
+    assert time.monotonic() - start >= 0.1
+
+def test_acquire_waits_for_a_release(factory):
+    pool = DriverPool(factory, max_size=1)
+    held = pool.acquire()
+
+    threading.Timer(0.05, pool.release, args=(held,)).start()
+    assert pool.acquire(timeout=5) is held
+
+def test_prewarms_min_idle_drivers(factory):
+    pool = DriverPool(factory, max_size=3, min_idle=2)
+    pool._fill_min_idle()
+
+    deadline = time.monotonic() + 5
+    while pool.stats()["idle"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert pool.stats()["idle"] == 2
+
+def test_close_quits_idle_drivers_and_refuses_checkouts(factory):
+    pool = DriverPool(factory, max_size=2)
+    with pool.driver() as driver:
+        pass
+
+    pool.close()
+    assert driver.quit_calls == 1
+    with pytest.raises(RuntimeError):
+        pool.acquire()
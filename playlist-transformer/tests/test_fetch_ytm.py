@@ -0,0 +1,36 @@
+from fetch_ytm import YTMFetcher
+
+class FakeYTMusic:
+    """Library endpoints that, like ytmusicapi, stop at ``limit`` items (25 by default)"""
+
+    def __init__(self, size):
+        self.size = size
+
+    def _items(self, limit, make):
+        count = self.size if limit is None else min(limit, self.size)
+        return [make(i) for i in range(count)]
+
+    def get_library_playlists(self, limit=25):
+        return self._items(limit, lambda i: {"title": f"Playlist {i}", "playlistId": f"PL{i}"})
+
+    def get_library_albums(self, limit=25, order=None):
+        return self._items(limit, lambda i: {"title": f"Album {i}", "browseId": f"MPRE{i}",
+                                             "artists": [{"name": "Artist"}]})
+
+    def get_library_subscriptions(self, limit=25, order=None):
+        return self._items(limit, lambda i: {"artist": f"Artist {i}", "browseId": f"UC{i}"})
+
+def _fetcher(size):
+    fetcher = YTMFetcher()
+    fetcher.ytm = FakeYTMusic(size)
+    fetcher.iter_playlist_tracks = lambda playlist_id: iter([])
+    return fetcher
+
+def test_library_sections_are_not_cut_off_at_25_items():
+    fetcher = _fetcher(320)
+
+    playlists = fetcher._fetch_playlists()
+    assert len(playlists) == 320
+    assert playlists["playlist_319"]["name"] == "Playlist 319"
+    assert len(fetcher._fetch_saved_albums()) == 320
+    assert len(fetcher._fetch_subscribed_artists()) == 320
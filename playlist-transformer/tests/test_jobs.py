@@ -0,0 +1,85 @@
+import subprocess
+import sys
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+import api
+import registry
+from jobs import JobCancelled, JobManager, MatchJob, SQLiteJobStore
+from tracks import Track
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_removing_a_running_job_stops_it_and_forgets_its_rows(tmp_path):
+    store = SQLiteJobStore(str(tmp_path / "jobs.db"))
+    manager = JobManager(store=store)
+    started, stopped = threading.Event(), threading.Event()
+
+    def run(job):
+        job.record(0, {"status": "matched"})
+        started.set()
+        try:
+            while True:
+                job.record(1, {"status": "matched"})
+                time.sleep(0.01)
+        except JobCancelled:
+            stopped.set()
+            raise
+
+    job = manager.start("session", 2, run)
+    assert started.wait(5)
+    manager.remove(job.job_id)
+
+    assert stopped.wait(5)
+    assert manager.get(job.job_id) is None
+    assert store.progress(job.job_id) is None
+    assert store.updates_since(job.job_id, 0) == []
+
+def test_store_fails_jobs_left_running_by_a_dead_process(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    store = SQLiteJobStore(path)
+    orphan = MatchJob("session", 3, store=store)
+    alive = MatchJob("session", 3, store=store)
+
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    store._conn.execute("UPDATE match_jobs SET owner_pid = ? WHERE job_id = ?", (dead.pid, orphan.job_id))
+    store._conn.commit()
+
+    restarted = SQLiteJobStore(path)
+
+    assert restarted.progress(orphan.job_id)["status"] == "failed"
+    assert restarted.progress(orphan.job_id)["error"]
+    # Owned by this (live) process
+    assert restarted.progress(alive.job_id)["status"] == "running"
+
+class _FakeEngine:
+    def match_tracks(self, tracks, source_platform, target_platform, on_result=None, on_dedup=None):
+        results = []
+        for index, track in enumerate(tracks):
+            entry = {"original_id": track["id"], "status": "not_found", "matched_id": None}
+            on_result(index, entry)
+            results.append(entry)
+        return results
+
+def test_rematching_replaces_the_previous_job(monkeypatch):
+    monkeypatch.setattr(registry, "get_match_engine", lambda: _FakeEngine())
+    client = TestClient(api.app)
+    library = {"tracks": {"t1": Track(title="Song", artist="Artist", id="t1")}}
+    session_id = api.session_data.create(api.ConversionSession("spotify", "ytm", source_library=library))
+
+    job_ids = []
+    for _ in range(2):
+        client.post("/match", data={"session_id": session_id, "selected_items": ["t1"]}, follow_redirects=False)
+        job_ids.append(api.session_data[session_id].match_job_id)
+        assert _wait_for(lambda: api.session_data[session_id].matched_tracks)
+
+    assert job_ids[0] != job_ids[1]
+    assert api.job_manager.get(job_ids[0]) is None
+    assert api.job_manager.get(job_ids[1]) is not None
@@ -0,0 +1,116 @@
+import json
+
+import pytest
+
+import spotify_client
+from spotify_client import SpotifyWebClient
+
+API = "http://spotify.test/v1"
+TOKEN_URL = "http://spotify.test/get_access_token"
+
+class FakeResponse:
+    def __init__(self, status_code=200, data=None, headers=None):
+        self.status_code = status_code
+        self.content = json.dumps(data).encode() if data is not None else b""
+        self.headers = headers or {}
+        self._data = data
+
+    def json(self):
+        return self._data
+
+    def raise_for_status(self):
+        import requests
+
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"HTTP {self.status_code}", response=self)
+
+class FakeSession:
+    """Stand-in for requests.Session: the token endpoint plus queued or routed API responses"""
+
+    def __init__(self, routes=None):
+        self.routes = routes or {}
+        self.queued = []
+        self.calls = []
+        self.tokens_issued = 0
+
+    def get(self, url, cookies=None, timeout=None):
+        self.tokens_issued += 1
+        return FakeResponse(data={"accessToken": f"token-{self.tokens_issued}", "isAnonymous": False})
+
+    def request(self, method, url, headers=None, timeout=None, params=None, json=None):
+        self.calls.append({"method": method, "url": url, "token": headers["Authorization"],
+                           "params": params, "json": json})
+        if self.queued:
+            return self.queued.pop(0)
+        return self.routes[(method, url)]
+
+@pytest.fixture
+def client():
+    client = SpotifyWebClient(cookie_loader=lambda: [{"name": "sp_dc", "value": "cookie"}],
+                              api_base_url=API, token_url=TOKEN_URL, page_size=2)
+    client.session = FakeSession()
+    return client
+
+def _track(number):
+    return {"track": {"id": f"id{number}", "name": f"Song {number}", "uri": f"spotify:track:id{number}",
+                      "artists": [{"name": "Artist"}], "album": {"name": "Album"}, "duration_ms": 1000,
+                      "external_ids": {"isrc": f"ISRC{number}"}}}
+
+def test_follows_next_until_the_last_page(client):
+    client.session.routes = {
+        ("GET", f"{API}/me/tracks"): FakeResponse(data={"items": [_track(0), _track(1)],
+                                                        "next": f"{API}/me/tracks?offset=2&limit=2"}),
+        ("GET", f"{API}/me/tracks?offset=2&limit=2"): FakeResponse(data={"items": [_track(2)], "next": None})
+    }
+
+    pages = list(client.iter_liked_songs())
+
+    assert [len(page) for page in pages] == [2, 1]
+    assert pages[1][0]["isrc"] == "ISRC2"
+    # The first request sets the page size, the next URL carries its own
+    assert client.session.calls[0]["params"] == {"limit": 2}
+    assert client.session.calls[1]["params"] is None
+
+def test_refreshes_the_token_once_on_401(client):
+    client.session.queued = [FakeResponse(401), FakeResponse(data={"id": "user"})]
+
+    assert client.user_id() == "user"
+    assert [call["token"] for call in client.session.calls] == ["Bearer token-1", "Bearer token-2"]
+
+def test_gives_up_after_a_second_401(client):
+    import requests
+
+    client.session.queued = [FakeResponse(401), FakeResponse(401)]
+
+    with pytest.raises(requests.HTTPError):
+        client.user_id()
+    assert client.session.tokens_issued == 2
+
+def test_waits_retry_after_on_429(client, monkeypatch):
+    slept = []
+    monkeypatch.setattr(spotify_client.time, "sleep", slept.append)
+    client.session.queued = [FakeResponse(429, headers={"Retry-After": "3"}), FakeResponse(data={"id": "user"})]
+
+    assert client.user_id() == "user"
+    assert slept == [3.0]
+
+def test_adds_tracks_in_chunks_of_100(client):
+    client.session.routes = {("POST", f"{API}/playlists/PL/tracks"): FakeResponse(201, {"snapshot_id": "s"})}
+    uris = [f"spotify:track:id{i}" for i in range(250)]
+    progress = []
+
+    client.add_tracks("PL", uris, on_chunk=progress.append)
+
+    sent = [call["json"]["uris"] for call in client.session.calls]
+    assert [len(chunk) for chunk in sent] == [100, 100, 50]
+    assert sum(sent, []) == uris
+    assert progress == [100, 200, 250]
+
+def test_invalidate_forgets_token_and_user(client):
+    client.session.queued = [FakeResponse(data={"id": "first"}), FakeResponse(data={"id": "second"})]
+    assert client.user_id() == "first"
+
+    client.invalidate()
+
+    assert client.user_id() == "second"
+    assert client.session.tokens_issued == 2
@@ -0,0 +1,161 @@
+import sys
+from collections.abc import MutableMapping
+from typing import Dict, Iterator, List, Optional
+
+class _Record(MutableMapping):
+    """Fixed-field record in ``__slots__`` that reads and writes like a dict
+
+    Existing code keeps using ``record["title"]`` and ``record.get("artist", "")``,
+    but each record costs a fixed slot array instead of a hash table. A field
+    set to None counts as missing, like an absent dict key. ``to_dict()`` is
+    the view for JSON and templates.
+    """
+
+    __slots__ = ()
+    _fields: frozenset = frozenset()
+
+    def __getitem__(self, key: str):
+        value = getattr(self, key) if key in self._fields else None
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: str, default=None):
+        value = getattr(self, key) if key in self._fields else None
+        return default if value is None else value
+
+    def __contains__(self, key) -> bool:
+        return key in self._fields and getattr(self, key) is not None
+
+    def __setitem__(self, key: str, value):
+        if key not in self._fields:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __delitem__(self, key: str):
+        if key not in self:
+            raise KeyError(key)
+        setattr(self, key, None)
+
+    def __iter__(self) -> Iterator[str]:
+        return (name for name in self.__slots__ if getattr(self, name) is not None)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (dict, _Record)):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def __getstate__(self):
+        # Plain tuple: smaller spill files than pickle's default (None, {slot: value}) state
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    def to_dict(self) -> Dict:
+        data = {}
+        for name in self.__slots__:
+            value = getattr(self, name)
+            if value is not None:
+                data[name] = value
+        return data
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    # Artists and albums repeat across a library, share one string object per value
+    return sys.intern(value) if value else value
+
+class Track(_Record):
+    """One library or playlist track, see _Record
+
+    Artist and album strings are interned. Fields a platform does not
+    provide stay None and are left out of ``to_dict()``.
+    """
+
+    __slots__ = ("title", "artist", "album", "duration_ms", "isrc", "uri", "ytm_id", "type", "id")
+    _fields = frozenset(__slots__)
+
+    def __init__(self, title: str = "", artist: str = "", album: Optional[str] = None,
+                 duration_ms: Optional[int] = None, isrc: Optional[str] = None, uri: Optional[str] = None,
+                 ytm_id: Optional[str] = None, type: Optional[str] = None, id: Optional[str] = None):
+        self.title = title
+        self.artist = _intern(artist)
+        self.album = _intern(album)
+        self.duration_ms = duration_ms
+        self.isrc = isrc
+        self.uri = uri
+        self.ytm_id = ytm_id
+        self.type = type
+        self.id = id
+
+    def replace(self, **changes) -> "Track":
+        """Copy with some fields changed, like dict(track, **changes)"""
+        return Track(**dict(self.to_dict(), **changes))
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Track":
+        """Build from a track dict, ignoring keys that are not track fields"""
+        if isinstance(data, cls):
+            return data
+        return cls(**{key: value for key, value in data.items() if key in cls._fields})
+
+class MatchEntry(_Record):
+    """Result of matching one source track, see _Record
+
+    The original_* strings are the source Track's own objects, not copies.
+    """
+
+    __slots__ = ("original_id", "original_title", "original_artist", "matched_title", "matched_artist",
+                 "matched_id", "confidence", "status", "alternatives")
+    _fields = frozenset(__slots__)
+
+    def __init__(self, original_id: str = "", original_title: str = "", original_artist: str = "",
+                 matched_title: str = "", matched_artist: str = "", matched_id: str = "",
+                 confidence: float = 0, status: str = "not_found", alternatives: Optional[List[Dict]] = None):
+        self.original_id = original_id
+        self.original_title = original_title
+        self.original_artist = original_artist
+        self.matched_title = matched_title
+        self.matched_artist = _intern(matched_artist)
+        self.matched_id = matched_id
+        self.confidence = confidence
+        self.status = status
+        self.alternatives = alternatives if alternatives is not None else []
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "MatchEntry":
+        if isinstance(data, cls):
+            return data
+        return cls(**{key: value for key, value in data.items() if key in cls._fields})
+
+def compact_library(library: Optional[Dict]) -> Optional[Dict]:
+    """Turn the track dicts of a library (e.g. one decoded from JSON) into Track records
+
+    Sections stay dicts of id -> item; tracks of liked songs and of each
+    playlist's "tracks" list become Tracks. Playlists, albums and artists
+    are left as dicts.
+    """
+    if not library:
+        return library
+    for section in ("liked_songs", "tracks"):
+        items = library.get(section)
+        if items:
+            library[section] = {item_id: Track.from_dict(track) for item_id, track in items.items()}
+    for playlist in (library.get("playlists") or {}).values():
+        if playlist.get("tracks"):
+            playlist["tracks"] = [Track.from_dict(track) for track in playlist["tracks"]]
+    return library
+
+def json_default(value):
+    """``default=`` for json.dumps, serializes records as plain dicts"""
+    if isinstance(value, _Record):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")